@@ -0,0 +1,207 @@
+import numpy as np
+from MDP.mdp import ACTIONS, GRID_SIZE, PADDLE_CELLS, TERMINAL_STATE
+
+
+# Paddle displacement per action - stay, up or down respectively.
+ACTION_DELTAS = np.array(ACTIONS)
+
+
+def simulate_steps(ball_x, ball_y, velocity_x, velocity_y, paddle_y, actions, rng):
+    '''
+    Vectorized counterpart of mdp.simulate_step.
+    Advance every game by one time step without modifying the input arrays.
+    :param actions - int array with one action per game.
+    :param rng - numpy.random.Generator used for paddle bounces.
+
+    :returns (ball_x, ball_y, velocity_x, velocity_y, paddle_y), rewards
+        rewards: 1 Hit Paddle, 0 Hit nothing, -1 Paddle Missed, GAME-OVER
+    '''
+    # Update Paddle with action
+    paddle_y = np.clip(paddle_y + ACTION_DELTAS[actions], 0, 0.8)
+    ball_x = ball_x + velocity_x
+    ball_y = ball_y + velocity_y
+    velocity_x = velocity_x.copy()
+    velocity_y = velocity_y.copy()
+
+    # Bounce against ceiling and floor
+    below = ball_y < 0
+    above = ~below & (ball_y > 1)
+    ball_y[below] = -ball_y[below]
+    ball_y[above] = 2 - ball_y[above]
+    velocity_y[below | above] = -velocity_y[below | above]
+
+    # Bounce against the back wall or reach the paddle
+    behind = ball_x < 0
+    past = ~behind & (ball_x >= 1)
+    ball_x[behind] = -ball_x[behind]
+    velocity_x[behind] = -velocity_x[behind]
+
+    hit = past & (paddle_y > ball_y) & (ball_y > (paddle_y - 0.2))
+    miss = past & ~hit
+    if hit.any():
+        velocity_x[hit], velocity_y[hit] = random_velocities(velocity_x[hit], velocity_y[hit], rng)
+
+    rewards = np.zeros(len(actions), dtype=np.int64)
+    rewards[hit] = 1
+    rewards[miss] = -1
+
+    return (ball_x, ball_y, velocity_x, velocity_y, paddle_y), rewards
+
+
+def random_velocities(velocity_x, velocity_y, rng):
+    '''
+    Vectorized counterpart of mdp.random_velocity, including its clamping rules.
+    :returns randomized velocity_x, velocity_y arrays after a paddle hit
+    '''
+    n = len(velocity_x)
+    velocity_x = -velocity_x + rng.uniform(-0.015, 0.015, n)
+    velocity_y = velocity_y + rng.uniform(-0.03, 0.03, n)
+
+    # mdp.random_velocity scales by vx / vx, which is always 1
+    velocity_x[np.abs(velocity_x) < 0.03] = 0.03
+    velocity_x[np.abs(velocity_x) > 1] = 1
+    velocity_y[np.abs(velocity_y) > 1] = 1
+
+    return velocity_x, velocity_y
+
+
+def is_terminal(ball_x, ball_y, paddle_y):
+    '''
+    Vectorized game-over test used by Simulator.q_v.
+    '''
+    return (ball_x > 1) & ~((paddle_y > ball_y) & (ball_y > (paddle_y - 0.2)))
+
+
+def discretize_states(ball_x, ball_y, velocity_x, velocity_y, paddle_y):
+    '''
+    Vectorized counterpart of mdp.discretize.
+
+    :returns int array of shape (num_games, 5) with columns bx, by, vx, vy, py
+    '''
+    d_state = np.empty((len(ball_x), 5), dtype=np.int64)
+    d_state[:, 0] = d_pos(ball_x)
+    d_state[:, 1] = d_pos(ball_y)
+    d_state[:, 2] = np.where(velocity_x >= 0, 1, -1)
+    d_state[:, 3] = np.where(velocity_y > 0.015, 1, np.where(velocity_y < -0.015, -1, 0))
+    d_state[:, 4] = np.where(paddle_y >= 0.8, 11, np.floor(12 * paddle_y / 0.8))
+    return d_state
+
+
+def encode_states(ball_x, ball_y, velocity_x, velocity_y, paddle_y, terminal=None):
+    '''
+    Vectorized counterpart of mdp.state_index.
+    Map whole arrays of continuous states to q-table rows in one call.
+    :param terminal - optional boolean array, selected games map to TERMINAL_STATE.
+
+    :returns int array of q-table rows
+    '''
+    d_state = discretize_states(ball_x, ball_y, velocity_x, velocity_y, paddle_y)
+    rows = ((((d_state[:, 0] - 1) * GRID_SIZE + (d_state[:, 1] - 1)) * 2
+             + (d_state[:, 2] == 1)) * 3 + (d_state[:, 3] + 1)) * PADDLE_CELLS + d_state[:, 4]
+    if terminal is not None:
+        rows[terminal] = TERMINAL_STATE
+    return rows
+
+
+def d_pos(pos):
+    '''
+    Board is divided into 12x12 grid
+    Returns int array of appropriate cells
+    '''
+    cell_width = 1.0 / 12.0
+    cells = np.ceil(pos / cell_width)
+    cells = np.where(pos == 0, 1, cells)
+    return np.where(pos > 1, 12, cells)
+
+
+class BatchMDP:
+    '''
+    Vectorized Pong environment.
+    Holds the continuous state of num_games independent games in NumPy arrays
+    and advances all of them with the same rules as MDP.simulate_one_time_step.
+    '''
+
+    def __init__(self, num_games, rng=None):
+        '''
+        Setup num_games games in their initial state.
+        :param num_games - number of games simulated side by side.
+        :param rng - numpy.random.Generator used for paddle bounces.
+        '''
+        self.num_games = num_games
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.ball_x = np.empty(num_games)
+        self.ball_y = np.empty(num_games)
+        self.velocity_x = np.empty(num_games)
+        self.velocity_y = np.empty(num_games)
+        self.paddle_y = np.empty(num_games)
+        self.bounces = np.zeros(num_games, dtype=np.int64)
+        self.done = np.zeros(num_games, dtype=bool)
+
+        self.games_completed = 0
+        self.total_bounces = 0
+
+        self.reset_games(np.ones(num_games, dtype=bool))
+
+    def reset_games(self, mask):
+        '''
+        Put the selected games back into the initial state of MDP().
+        :param mask - boolean array selecting the games to reset.
+        '''
+        self.ball_x[mask] = 0.5
+        self.ball_y[mask] = 0.5
+        self.velocity_x[mask] = 0.03
+        self.velocity_y[mask] = 0.01
+        self.paddle_y[mask] = 0.5
+        self.bounces[mask] = 0
+        self.done[mask] = False
+
+    def reset_done(self):
+        '''
+        Restart the games that ended on the previous step and record their scores.
+        '''
+        if self.done.any():
+            self.games_completed += int(self.done.sum())
+            self.total_bounces += int(self.bounces[self.done].sum())
+            self.reset_games(self.done)
+
+    def state(self):
+        '''
+        :returns tuple of the five continuous state arrays
+        '''
+        return (self.ball_x, self.ball_y, self.velocity_x, self.velocity_y, self.paddle_y)
+
+    def step(self, actions):
+        '''
+        :param actions - int array with one action per game.
+        Advance every game by one time step.
+        Games that ended on the previous step are restarted first, so the
+        terminal state stays observable until the next call.
+
+        :returns int array of rewards
+            1: Hit Paddle
+            0: Hit nothing
+            -1: Paddle Missed, GAME-OVER
+        '''
+        self.reset_done()
+        next_state, rewards = simulate_steps(*self.state(), actions=actions, rng=self.rng)
+        (self.ball_x, self.ball_y, self.velocity_x, self.velocity_y, self.paddle_y) = next_state
+
+        self.bounces += rewards == 1
+        self.done = rewards == -1
+        return rewards
+
+    def discretize_state(self):
+        '''
+        Convert the continuous state of every game to a discrete state.
+        Mirrors MDP.discretize_state.
+
+        :returns int array of shape (num_games, 5) with columns bx, by, vx, vy, py
+        '''
+        return discretize_states(*self.state())
+
+    def encode_state(self):
+        '''
+        :returns int array with the q-table row of every game
+        '''
+        return encode_states(*self.state())
@@ -1,18 +1,176 @@
-import random
-import numpy as np
+import math
+
+from MDP.random_stream import RandomStream
+
+
+# Paddle displacement per action - stay, up or down respectively.
+ACTIONS = (0, 0.04, -0.04)
+
+# Discrete state space: 12 ball_x cells, 12 ball_y cells, 2 velocity_x signs,
+# 3 velocity_y buckets and 12 paddle cells, plus one absorbing game-over state.
+# A discrete state is stored in q-table row
+#   (((bx - 1) * 12 + (by - 1)) * 2 + (vx == 1)) * 3 + (vy + 1)) * 12 + py
+GRID_SIZE = 12
+PADDLE_CELLS = 12
+NUM_DISCRETE_STATES = GRID_SIZE * GRID_SIZE * 2 * 3 * PADDLE_CELLS
+TERMINAL_STATE = NUM_DISCRETE_STATES
+NUM_STATES = NUM_DISCRETE_STATES + 1
+
+
+def simulate_step(ball_x, ball_y, velocity_x, velocity_y, paddle_y, action_selected, rng):
+    '''
+    Pure counterpart of MDP.simulate_one_time_step.
+    Applies the same paddle, wall and bounce rules to a plain tuple of floats,
+    so successor states can be predicted without cloning an MDP.
+    :param rng - RandomStream for the velocity change of a paddle hit.
+
+    :returns (ball_x, ball_y, velocity_x, velocity_y, paddle_y), reward
+    '''
+    paddle_y += ACTIONS[action_selected]
+    if paddle_y < 0:
+        paddle_y = 0
+    elif paddle_y > 0.8:
+        paddle_y = 0.8
+    ball_x += velocity_x
+    ball_y += velocity_y
+
+    if ball_y < 0:
+        ball_y = -ball_y
+        velocity_y = -velocity_y
+    elif ball_y > 1:
+        ball_y = 2 - ball_y
+        velocity_y = -velocity_y
+
+    reward = 0
+    if ball_x < 0:
+        ball_x = -ball_x
+        velocity_x = -velocity_x
+    elif ball_x >= 1:
+        if not hit_paddle(ball_y, paddle_y):
+            reward = -1
+        else:
+            velocity_x, velocity_y = random_velocity(velocity_x, velocity_y, rng)
+            reward = 1
+
+    return (ball_x, ball_y, velocity_x, velocity_y, paddle_y), reward
+
+
+def random_velocity(velocity_x, velocity_y, rng):
+    '''
+    Pure counterpart of MDP.update_velocity.
+    :param rng - RandomStream or random module to draw from.
+    :returns randomized velocity_x, velocity_y after a paddle hit
+    '''
+    velocity_x = -velocity_x + rng.uniform(-0.015, 0.015)
+    velocity_y = velocity_y + rng.uniform(-0.03, 0.03)
+
+    if abs(velocity_x) < 0.03:
+        velocity_x = 0.03 * (velocity_x / velocity_x)
+
+    if abs(velocity_x) > 1:
+        velocity_x = 1 * (velocity_x / velocity_x)
+
+    if abs(velocity_y) > 1:
+        velocity_y = 1 * (velocity_y / velocity_y)
+
+    return velocity_x, velocity_y
+
+
+def hit_paddle(ball_y, paddle_y):
+    '''
+    Checks if a ball at ball_y will hit a paddle at paddle_y
+    '''
+    return paddle_y > ball_y and ball_y > (paddle_y - 0.2)
+
+
+def discretize(ball_x, ball_y, velocity_x, velocity_y, paddle_y):
+    '''
+    Pure counterpart of MDP.discretize_state.
+    '''
+    return (d_pos(ball_x), d_pos(ball_y), d_vx(velocity_x), d_vy(velocity_y), d_py(paddle_y))
+
+
+def encode(bx, by, vx, vy, py):
+    '''
+    Map a discretized state to its q-table row.
+    '''
+    return (((((bx - 1) * GRID_SIZE + (by - 1)) * 2 + (vx == 1)) * 3 + (vy + 1)) * PADDLE_CELLS
+            + py)
+
+
+def state_index(ball_x, ball_y, velocity_x, velocity_y, paddle_y):
+    '''
+    Map a continuous state straight to its q-table row.
+    '''
+    return encode(d_pos(ball_x), d_pos(ball_y), d_vx(velocity_x), d_vy(velocity_y), d_py(paddle_y))
+
+
+def d_pos(pos):
+    '''
+    Board is divided into 12x12 grid
+    Returns int of appropriate cell
+    '''
+    if pos == 0:
+        return 1
+    if pos > 1:
+        return 12
+    cell_width = 1.0 / 12.0
+    return math.ceil(pos / cell_width)
+
+
+def d_vx(vx):
+    '''
+    Discretize x velocity per documentation
+    '''
+    if vx >= 0:
+        return 1
+    else:
+        return -1
+
+
+def d_vy(vy):
+    '''
+    Discretize y velocity per documentation
+    '''
+    if vy > 0.015:
+        return 1
+    elif vy < -0.015:
+        return -1
+    else:
+        return 0
+
+
+def d_py(py):
+    '''
+    Discretize paddle y per documentation
+    '''
+    if py >= 0.8:
+        return 11
+    else:
+        return math.floor(12 * py / 0.8)
 
 
 class MDP:
 
+    # Compact instances: no per-instance __dict__
+    __slots__ = ('paddle_height', 'ball_x', 'ball_y', 'velocity_x', 'velocity_y', 'paddle_y', 'rng')
+
+    # the agent can choose between 3 actions - stay, up or down respectively.
+    actions = ACTIONS
+
     def __init__(self,
                  ball_x=None,
                  ball_y=None,
                  velocity_x=None,
                  velocity_y=None,
-                 paddle_y=None):
+                 paddle_y=None,
+                 rng=None):
         '''
         Setup MDP with the initial values provided.
+        :param rng - RandomStream for paddle bounces, defaults to a new one
+                     seeded from fresh entropy, so no two MDPs share a stream.
         '''
+        self.rng = rng if rng is not None else RandomStream()
         self.create_state(
             ball_x=ball_x,
             ball_y=ball_y,
@@ -20,11 +178,18 @@ class MDP:
             velocity_y=velocity_y,
             paddle_y=paddle_y
         )
-        
-        # the agent can choose between 3 actions - stay, up or down respectively.
-        self.actions = [0, 0.04, -0.04]
-        
-    
+
+    def reset(self):
+        '''
+        Return to the initial state of a new game without reallocating.
+        '''
+        self.ball_x = 0.5
+        self.ball_y = 0.5
+        self.velocity_x = 0.03
+        self.velocity_y = 0.01
+        self.paddle_y = 0.5
+        return self
+
     def create_state(self,
               ball_x=None,
               ball_y=None,
@@ -117,17 +282,7 @@ class MDP:
         Update velocity by a random value
         Called every time the ball hits the paddle
         '''
-        self.velocity_x = -self.velocity_x + random.uniform(-0.015, 0.015)
-        self.velocity_y = self.velocity_y + random.uniform(-0.03, 0.03)
-
-        if abs(self.velocity_x) < 0.03:
-            self.velocity_x = 0.03 * (self.velocity_x / self.velocity_x)
-
-        if abs(self.velocity_x) > 1:
-            self.velocity_x = 1 * (self.velocity_x / self.velocity_x)
-
-        if abs(self.velocity_y) > 1:
-            self.velocity_y = 1 * (self.velocity_y / self.velocity_y)
+        self.velocity_x, self.velocity_y = random_velocity(self.velocity_x, self.velocity_y, self.rng)
 
     def flip_vx(self):
         '''
@@ -147,56 +302,41 @@ class MDP:
         '''
         Checks if ball's position will hit paddle
         '''
-        return self.paddle_y > self.ball_y and self.ball_y > (self.paddle_y - 0.2)
+        return hit_paddle(self.ball_y, self.paddle_y)
+
+    def continuous_state(self):
+        '''
+        :returns the continuous state as a tuple of floats
+        '''
+        return (self.ball_x, self.ball_y, self.velocity_x, self.velocity_y, self.paddle_y)
 
     def discretize_state(self):
         '''
         Convert the current continuous state to a discrete state.
         '''
-        bx = self.d_pos(self.ball_x)
-        by = self.d_pos(self.ball_y)
-        vx = self.d_vx(self.velocity_x)
-        vy = self.d_vy(self.velocity_y)
-        py = self.d_py(self.paddle_y)
-        return (bx, by, vx, vy, py)
+        return discretize(self.ball_x, self.ball_y, self.velocity_x, self.velocity_y, self.paddle_y)
 
     def d_pos(self, pos):
         '''
         Board is divided into 12x12 grid
         Returns int of appropriate cell
         '''
-        if pos == 0:
-            return 1
-        if pos > 1:
-            return 12
-        cell_width = 1.0 / 12.0
-        return int(np.ceil(pos / cell_width))
+        return d_pos(pos)
 
     def d_vx(self, vx):
         '''
         Discretize x velocity per documentation
         '''
-        if vx >= 0:
-            return 1
-        else:
-            return -1
+        return d_vx(vx)
 
     def d_vy(self, vy):
         '''
         Discretize y velocity per documentation
         '''
-        if vy > 0.015:
-            return 1
-        elif vy < -0.015:
-            return -1
-        else:
-            return 0
+        return d_vy(vy)
 
     def d_py(self, py):
         '''
         Discretize paddle y per documentation
         '''
-        if py >= 0.8:
-            return 11
-        else:
-            return np.floor(12 * py / 0.8)
+        return d_py(py)
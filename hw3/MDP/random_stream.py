@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class RandomStream:
+    '''
+    Seedable random stream with the parts of the random module API the
+    simulator uses. Uniform draws are generated by a numpy.random.Generator
+    in blocks of block_size and handed out one at a time, so a step costs a
+    list lookup instead of a generator call. Every draw consumes exactly one
+    uniform, which keeps the stream reproducible across code paths that
+    replay the same sequence of draws.
+    '''
+
+    def __init__(self, seed=None, block_size=4096):
+        '''
+        :param seed - int, numpy.random.SeedSequence, numpy.random.Generator or
+                      None for fresh entropy.
+        :param block_size - uniforms generated per block.
+        '''
+        if isinstance(seed, np.random.Generator):
+            self.generator = seed
+        else:
+            self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.block = []
+        self.pos = 0
+
+    def refill(self):
+        '''
+        Generate the next block, keeping the draws not handed out yet.
+        '''
+        self.block = self.block[self.pos:] + self.generator.random(self.block_size).tolist()
+        self.pos = 0
+
+    def random(self):
+        '''
+        :returns float in [0, 1)
+        '''
+        if self.pos == len(self.block):
+            self.refill()
+        u = self.block[self.pos]
+        self.pos += 1
+        return u
+
+    def uniform(self, a, b):
+        '''
+        :returns float in [a, b)
+        '''
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        '''
+        :returns int in [a, b], both inclusive like random.randint
+        '''
+        return a + int(self.random() * (b - a + 1))
+
+    def spawn(self, n):
+        '''
+        Derive n independent child streams, e.g. one per parallel worker.
+        '''
+        return [RandomStream(g, self.block_size) for g in self.generator.spawn(n)]
+
+    def get_state(self):
+        '''
+        :returns picklable state that set_state restores exactly
+        '''
+        return {'bit_generator': self.generator.bit_generator.state,
+                'pending': self.block[self.pos:]}
+
+    def set_state(self, state):
+        self.generator.bit_generator.state = state['bit_generator']
+        self.block = list(state['pending'])
+        self.pos = 0
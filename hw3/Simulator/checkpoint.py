@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+from MDP.mdp import GRID_SIZE, PADDLE_CELLS, NUM_STATES
+from Simulator.simulator import Simulator
+
+
+# A checkpoint named path is stored as two files:
+#     path.npz           hyperparameters, progress, state layout, visited states
+#                        and the state of the random stream
+#     path.q_table.npy   the q-table, as a plain .npy so it can be memory-mapped
+# Both are written to a temporary file first and then moved into place, so an
+# interrupted save never leaves a truncated checkpoint behind.
+
+
+def checkpoint_files(path):
+    '''
+    :returns file names of the metadata and the q-table of checkpoint path
+    '''
+    if path.endswith('.npz'):
+        path = path[:-len('.npz')]
+    return path + '.npz', path + '.q_table.npy'
+
+
+def save_checkpoint(simulator, path):
+    '''
+    Save the simulator's q-table, state layout, hyperparameters and random stream.
+    '''
+    meta_file, table_file = checkpoint_files(path)
+
+    with open(table_file + '.tmp', 'wb') as f:
+        np.save(f, simulator.q_table)
+    os.replace(table_file + '.tmp', table_file)
+
+    with open(meta_file + '.tmp', 'wb') as f:
+        np.savez(f,
+                 num_games=simulator.num_games,
+                 alpha_value=simulator.alpha_value,
+                 gamma_value=simulator.gamma_val,
+                 epsilon_value=simulator.epsilon_value,
+                 games_trained=simulator.games_trained,
+                 layout=np.array([GRID_SIZE, PADDLE_CELLS, NUM_STATES]),
+                 visited=simulator.visited,
+                 rng_state=json.dumps(simulator.rng.get_state()))
+    os.replace(meta_file + '.tmp', meta_file)
+
+
+def load_checkpoint(path):
+    '''
+    Restore a simulator from checkpoint path without running it.
+    Calling train_agent on it resumes training, raise num_games to train further.
+    '''
+    meta_file, _ = checkpoint_files(path)
+    with np.load(meta_file) as meta:
+        check_layout(meta['layout'])
+        simulator = Simulator(int(meta['num_games']),
+                              float(meta['alpha_value']),
+                              float(meta['gamma_value']),
+                              float(meta['epsilon_value']),
+                              run=False)
+        simulator.games_trained = int(meta['games_trained'])
+        simulator.visited[:] = meta['visited']
+        if 'rng_state' in meta:
+            simulator.rng.set_state(json.loads(str(meta['rng_state'])))
+
+    simulator.q_table[:] = load_q_table(path)
+    return simulator
+
+
+def load_q_table(path, mmap=True):
+    '''
+    Load the q-table of checkpoint path.
+    :param mmap - memory-map the table read-only instead of reading it, so any
+                  number of processes can serve the same policy from one copy.
+    '''
+    _, table_file = checkpoint_files(path)
+    q_table = np.load(table_file, mmap_mode='r' if mmap else None)
+    if q_table.shape != (NUM_STATES, 3):
+        raise ValueError('q-table of shape %s does not match this state layout' % (q_table.shape,))
+    return q_table
+
+
+def check_layout(layout):
+    '''
+    Reject checkpoints saved with a different discretization.
+    '''
+    if tuple(layout) != (GRID_SIZE, PADDLE_CELLS, NUM_STATES):
+        raise ValueError('checkpoint state layout %s does not match %s'
+                         % (tuple(layout), (GRID_SIZE, PADDLE_CELLS, NUM_STATES)))
@@ -0,0 +1,124 @@
+import multiprocessing
+
+import numpy as np
+
+from MDP.batch_mdp import BatchMDP
+from MDP.mdp import NUM_STATES
+from MDP.random_stream import RandomStream
+from Simulator.checkpoint import load_q_table
+from Simulator.parallel import SharedTable
+from Simulator.simulator import Simulator
+
+
+def summarize(bounces):
+    '''
+    :param bounces - int array with the bounces of every game played.
+    :returns dict with the mean, variance and distribution of the bounces,
+             distribution[b] is the number of games that ended after b bounces;
+             mean and variance are 0 when no game was played
+    '''
+    bounces = np.asarray(bounces, dtype=np.int64)
+    return {
+        'games': len(bounces),
+        'mean': float(bounces.mean()) if len(bounces) else 0.0,
+        'variance': float(bounces.var()) if len(bounces) else 0.0,
+        'distribution': np.bincount(bounces),
+        'bounces': bounces,
+    }
+
+
+def evaluate_worker(args):
+    '''
+    Play greedy games against the shared, frozen q-table.
+    :returns list of bounces per game
+    '''
+    table_name, checkpoint, num_games, rng = args
+
+    table = None
+    sim = Simulator(run=False, seed=rng)
+    if checkpoint is not None:
+        sim.q_table = load_q_table(checkpoint)
+    else:
+        table = SharedTable((NUM_STATES, 3), table_name)
+        sim.q_table = table.array
+        sim.q_table.flags.writeable = False
+    bounces = [sim.simulate_game(learn=False) for x in range(0, num_games)]
+
+    sim.q_table = None
+    if table is not None:
+        table.close()
+    return bounces
+
+
+def evaluate(q_table, num_games=5000, processes=None, seed=None):
+    '''
+    Play num_games greedy games with a frozen q-table across a process pool.
+    The table is shared read-only through shared memory and every worker
+    plays with its own seeded random stream.
+
+    :param q_table - trained q-table, left untouched, or the path of a
+                     checkpoint that every worker memory-maps.
+    :param processes - pool size, defaults to the number of cores, and never
+                       more than num_games.
+    :param seed - seed the workers' independent child streams are spawned from.
+    :returns dict, see summarize
+    '''
+    if num_games <= 0:
+        return summarize([])
+    processes = min(processes or multiprocessing.cpu_count(), num_games)
+    table = None
+    checkpoint = None
+    if isinstance(q_table, str):
+        checkpoint = q_table
+    else:
+        table = SharedTable((NUM_STATES, 3))
+        table.array[:] = q_table
+
+    shares = [num_games // processes + (w < num_games % processes) for w in range(0, processes)]
+    jobs = [(table and table.name, checkpoint, shares[w], rng.generator)
+            for w, rng in enumerate(RandomStream(seed).spawn(processes))]
+
+    try:
+        with multiprocessing.Pool(len(jobs)) as pool:
+            bounces = sum(pool.map(evaluate_worker, jobs), [])
+    finally:
+        if table is not None:
+            table.close()
+            table.unlink()
+
+    return summarize(bounces)
+
+
+def evaluate_batch(q_table, num_games=5000, num_envs=1000, rng=None):
+    '''
+    Play num_games greedy games with a frozen q-table as a vectorized batch.
+    At most num_envs games run at once; a finished game is only restarted
+    while fewer than num_games games have been started.
+
+    :param rng - numpy.random.Generator for ties and paddle bounces.
+    :returns dict, see summarize
+    '''
+    num_envs = min(num_envs, num_games)
+    sim = Simulator(run=False)
+    sim.q_table = q_table
+    env = BatchMDP(num_envs, rng)
+
+    active = np.ones(num_envs, dtype=bool)
+    started = num_envs
+    bounces = []
+    while active.any():
+        finished = env.done & active
+        bounces.extend(env.bounces[finished])
+
+        # Finished games past the budget stop counting
+        restart = np.flatnonzero(finished)[:num_games - started]
+        started += len(restart)
+        active &= ~finished
+        active[restart] = True
+        env.reset_done()
+
+        if active.any():
+            _, actions = sim.get_best_next_s_batch(env.state(), env.rng)
+            env.step(actions)
+
+    return summarize(bounces)
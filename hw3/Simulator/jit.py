@@ -0,0 +1,258 @@
+import math
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# The kernels below replay Simulator.simulate_game one operation at a time:
+# the same float arithmetic, the same order of random draws and the same
+# lookahead cache, so under the same seed they produce the same q-table as
+# train_agent. Without numba they stay plain Python functions and train_jit
+# uses train_agent instead.
+if numba is not None:
+    njit = numba.njit(cache=True)
+else:
+    def njit(f):
+        return f
+
+
+@njit
+def draw(pending, cursor, generator):
+    '''
+    Next uniform of a RandomStream: its pending block first, then the generator.
+    '''
+    i = cursor[0]
+    if i < len(pending):
+        cursor[0] = i + 1
+        return pending[i]
+    return generator.random()
+
+
+@njit
+def step(ball_x, ball_y, velocity_x, velocity_y, paddle_y, action, pending, cursor, generator):
+    '''
+    MDP.simulate_step
+    :returns ball_x, ball_y, velocity_x, velocity_y, paddle_y, reward
+    '''
+    if action == 1:
+        paddle_y += 0.04
+    elif action == 2:
+        paddle_y += -0.04
+    else:
+        paddle_y += 0
+    if paddle_y < 0:
+        paddle_y = 0.0
+    elif paddle_y > 0.8:
+        paddle_y = 0.8
+    ball_x += velocity_x
+    ball_y += velocity_y
+
+    if ball_y < 0:
+        ball_y = -ball_y
+        velocity_y = -velocity_y
+    elif ball_y > 1:
+        ball_y = 2 - ball_y
+        velocity_y = -velocity_y
+
+    reward = 0
+    if ball_x < 0:
+        ball_x = -ball_x
+        velocity_x = -velocity_x
+    elif ball_x >= 1:
+        if not (paddle_y > ball_y and ball_y > (paddle_y - 0.2)):
+            reward = -1
+        else:
+            # MDP.random_velocity
+            velocity_x = -velocity_x + (-0.015 + (0.015 - -0.015) * draw(pending, cursor, generator))
+            velocity_y = velocity_y + (-0.03 + (0.03 - -0.03) * draw(pending, cursor, generator))
+            if abs(velocity_x) < 0.03:
+                velocity_x = 0.03 * (velocity_x / velocity_x)
+            if abs(velocity_x) > 1:
+                velocity_x = 1 * (velocity_x / velocity_x)
+            if abs(velocity_y) > 1:
+                velocity_y = 1 * (velocity_y / velocity_y)
+            reward = 1
+
+    return ball_x, ball_y, velocity_x, velocity_y, paddle_y, reward
+
+
+@njit
+def d_pos(pos):
+    if pos == 0:
+        return 1
+    if pos > 1:
+        return 12
+    return math.ceil(pos / (1.0 / 12.0))
+
+
+@njit
+def state_index(ball_x, ball_y, velocity_x, velocity_y, paddle_y):
+    '''
+    MDP.state_index
+    '''
+    vx = 1 if velocity_x >= 0 else 0
+    if velocity_y > 0.015:
+        vy = 2
+    elif velocity_y < -0.015:
+        vy = 0
+    else:
+        vy = 1
+    if paddle_y >= 0.8:
+        py = 11
+    else:
+        py = math.floor(12 * paddle_y / 0.8)
+    return ((((d_pos(ball_x) - 1) * 12 + (d_pos(ball_y) - 1)) * 2 + vx) * 3 + vy) * 12 + py
+
+
+@njit
+def lookahead(state, successors, terminal, visited, pending, cursor, generator):
+    '''
+    Simulator.lookahead without the cache, successors and terminal are filled in.
+    :returns whether a successor involved a random paddle bounce
+    '''
+    randomized = False
+    for a in range(0, 3):
+        bx, by, vx, vy, py, r = step(state[0], state[1], state[2], state[3], state[4], a,
+                                     pending, cursor, generator)
+        i = state_index(bx, by, vx, vy, py)
+        successors[a] = i
+        terminal[a] = bx > 1 and not (py > by and by > (py - 0.2))
+        if not terminal[a]:
+            visited[i] = True
+        randomized = randomized or r == 1
+    return randomized
+
+
+@njit
+def best_action(q_table, visited, successors, terminal, q, pending, cursor, generator):
+    '''
+    Simulator.get_best_next_s on the successors of a lookahead, the picked
+    successor is marked visited
+    '''
+    for a in range(0, 3):
+        q[a] = -1 if terminal[a] else q_table[successors[a], a]
+
+    if q[0] > q[1] and q[0] > q[2]:
+        ac_s = 0
+    elif q[1] > q[0] and q[1] > q[2]:
+        ac_s = 1
+    elif q[2] > q[0] and q[2] > q[1]:
+        ac_s = 2
+    else:
+        ac_s = int(draw(pending, cursor, generator) * 3)
+    visited[successors[ac_s]] = True
+    return ac_s
+
+
+@njit
+def cache_hit(state, cached):
+    return (state[0] == cached[0] and state[1] == cached[1] and state[2] == cached[2]
+            and state[3] == cached[3] and state[4] == cached[4])
+
+
+@njit
+def train_games(q_table, visited, num_games, alpha_value, gamma_value, epsilon_value,
+                pending, cursor, generator):
+    '''
+    Simulator.train_agent over num_games games, updating q_table and visited
+    in place.
+    :param pending, cursor - undrawn uniforms of the RandomStream and the
+                             index of the next one, advanced in place.
+    :param generator - the RandomStream's numpy.random.Generator.
+    :returns int array with the bounces of every game
+    '''
+    bounces = np.zeros(num_games, dtype=np.int64)
+    state = np.empty(5)
+    successors = np.empty(3, dtype=np.int64)
+    terminal = np.zeros(3, dtype=np.bool_)
+    q = np.empty(3)
+
+    # Simulator.lookahead_cache: the key state and whether it holds successors
+    cached = np.empty(5)
+    cache_valid = False
+
+    for g in range(0, num_games):
+        state[0] = 0.5
+        state[1] = 0.5
+        state[2] = 0.03
+        state[3] = 0.01
+        state[4] = 0.5
+        r = 0
+        b = 0
+        while r != -1:
+            # choose_action
+            x = draw(pending, cursor, generator)
+            if x <= epsilon_value:
+                ac_s = int(draw(pending, cursor, generator) * 3)
+            else:
+                if not (cache_valid and cache_hit(state, cached)):
+                    cache_valid = not lookahead(state, successors, terminal, visited,
+                                                pending, cursor, generator)
+                    cached[:] = state
+                ac_s = best_action(q_table, visited, successors, terminal, q,
+                                   pending, cursor, generator)
+
+            bx, by, vx, vy, py, r = step(state[0], state[1], state[2], state[3], state[4], ac_s,
+                                         pending, cursor, generator)
+            state[0] = bx
+            state[1] = by
+            state[2] = vx
+            state[3] = vy
+            state[4] = py
+            if r == 1:
+                b += r
+
+            # update_q_table
+            row = state_index(state[0], state[1], state[2], state[3], state[4])
+            if state[0] > 1 and not (state[4] > state[1] and state[1] > (state[4] - 0.2)):
+                q_s = -1.0
+            else:
+                visited[row] = True
+                q_s = q_table[row, ac_s]
+            if not (cache_valid and cache_hit(state, cached)):
+                cache_valid = not lookahead(state, successors, terminal, visited,
+                                            pending, cursor, generator)
+                cached[:] = state
+            b_a = best_action(q_table, visited, successors, terminal, q, pending, cursor, generator)
+            new_q = q_s + alpha_value * (r + gamma_value * q_table[successors[b_a], b_a] - q_s)
+            visited[row] = True
+            q_table[row, ac_s] = new_q
+
+        bounces[g] = b
+
+    return bounces
+
+
+def train_jit(simulator):
+    '''
+    Train simulator until it has been trained on num_games games, running
+    whole stretches of games inside one compiled call. Checkpoints are saved
+    between stretches like in train_agent. Without numba, or with a monitor or
+    a replay buffer set, this is simulator.train_agent().
+    '''
+    if numba is None or simulator.monitor is not None or simulator.replay is not None:
+        return simulator.train_agent()
+
+    rng = simulator.rng
+    while simulator.games_trained < simulator.num_games:
+        games = simulator.num_games - simulator.games_trained
+        if simulator.checkpoint_interval:
+            games = min(games, simulator.checkpoint_interval
+                        - simulator.games_trained % simulator.checkpoint_interval)
+
+        pending = np.array(rng.block[rng.pos:], dtype=np.float64)
+        cursor = np.zeros(1, dtype=np.int64)
+        train_games(simulator.q_table, simulator.visited, games, float(simulator.alpha_value),
+                    float(simulator.gamma_val), float(simulator.epsilon_value),
+                    pending, cursor, rng.generator)
+        rng.block = pending[cursor[0]:].tolist()
+        rng.pos = 0
+        simulator.lookahead_cache = (None, None)
+
+        simulator.games_trained += games
+        if simulator.checkpoint_interval and simulator.games_trained % simulator.checkpoint_interval == 0:
+            simulator.save(simulator.checkpoint_path)
@@ -0,0 +1,111 @@
+import json
+import time
+from collections import deque
+
+
+class TrainingMonitor:
+    '''
+    Collects training metrics from Simulator.train_agent and emits them every
+    interval games. Set it as simulator.monitor to enable it; while attached it
+    wraps the simulator's lookahead and update_q_table with timers, so a
+    simulator without a monitor runs the plain methods.
+
+    Emitted records hold:
+        games, steps: totals so far
+        games_per_sec, steps_per_sec: rates over the last interval
+        rolling_bounces: mean bounces over the last window games
+        used_states: distinct states with a q-table row
+        lookahead_seconds, update_seconds: time spent in the lookahead and
+            in the rest of the q-update, over the last interval
+        elapsed: seconds since training started
+    '''
+
+    def __init__(self, interval=1000, callback=None, path=None, window=1000):
+        '''
+        :param interval - games between two emitted records.
+        :param callback - called with every record as a dict.
+        :param path - JSON-lines file every record is appended to.
+        :param window - number of games in the rolling bounce mean.
+        '''
+        self.interval = interval
+        self.callback = callback
+        self.path = path
+        self.bounces = deque(maxlen=window)
+        self.records = []
+
+        self.games = 0
+        self.steps = 0
+        self.lookahead_seconds = 0.0
+        self.update_seconds = 0.0
+        self.start = None
+        self.last = None
+
+    def attach(self, simulator):
+        '''
+        Install the timing wrappers on simulator.
+        '''
+        lookahead = simulator.lookahead
+        update_q_table = simulator.update_q_table
+
+        def timed_lookahead(state):
+            t = time.perf_counter()
+            successors = lookahead(state)
+            self.lookahead_seconds += time.perf_counter() - t
+            return successors
+
+        def timed_update_q_table(r, a, s):
+            t = time.perf_counter()
+            in_lookahead = self.lookahead_seconds
+            successors = update_q_table(r, a, s)
+            self.update_seconds += time.perf_counter() - t - (self.lookahead_seconds - in_lookahead)
+            self.steps += 1
+            return successors
+
+        simulator.lookahead = timed_lookahead
+        simulator.update_q_table = timed_update_q_table
+
+        self.start = time.perf_counter()
+        self.last = (self.start, self.games, self.steps, 0.0, 0.0)
+
+    def detach(self, simulator):
+        '''
+        Remove the timing wrappers from simulator.
+        '''
+        del simulator.lookahead
+        del simulator.update_q_table
+
+    def game_finished(self, simulator, bounces):
+        '''
+        Record a finished training game, emit a record every interval games.
+        '''
+        self.games += 1
+        self.bounces.append(bounces)
+        if self.games % self.interval == 0:
+            self.emit(simulator)
+
+    def emit(self, simulator):
+        '''
+        Build a record for the games since the last one and publish it.
+        '''
+        now = time.perf_counter()
+        last_time, last_games, last_steps, last_lookahead, last_update = self.last
+        seconds = max(now - last_time, 1e-9)
+        record = {
+            'games': self.games,
+            'steps': self.steps,
+            'games_per_sec': (self.games - last_games) / seconds,
+            'steps_per_sec': (self.steps - last_steps) / seconds,
+            'rolling_bounces': sum(self.bounces) / float(max(len(self.bounces), 1)),
+            'used_states': simulator.used_states,
+            'lookahead_seconds': self.lookahead_seconds - last_lookahead,
+            'update_seconds': self.update_seconds - last_update,
+            'elapsed': now - self.start,
+        }
+        self.last = (now, self.games, self.steps, self.lookahead_seconds, self.update_seconds)
+
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
@@ -0,0 +1,176 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from MDP.mdp import NUM_STATES
+from MDP.random_stream import RandomStream
+from Simulator.simulator import Simulator
+
+
+MERGE_MODES = ('average', 'delta')
+
+
+class SharedTable:
+    '''
+    NumPy array backed by a named shared memory block.
+    Workers attach by name, so the table is never pickled between processes.
+    '''
+
+    def __init__(self, shape, name=None):
+        '''
+        Create a new zeroed block, or attach to an existing one.
+        :param shape - shape of the float64 array.
+        :param name - name of an existing block to attach to.
+        '''
+        size = int(np.prod(shape)) * np.dtype(np.float64).itemsize
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        if name is None:
+            self.array[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        '''
+        Detach from the block, call unlink() as well from the owner.
+        '''
+        self.array = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def train_worker(args):
+    '''
+    Train a private copy of the shared q-table for a number of games.
+    The trained copy is written to this worker's slot of the slot table.
+    :returns states visited by this worker
+    '''
+    table_name, slots_name, num_workers, worker_id, num_games, params, rng = args
+
+    table = SharedTable((NUM_STATES, 3), table_name)
+    slots = SharedTable((num_workers, NUM_STATES, 3), slots_name)
+
+    sim = Simulator(num_games, *params, run=False, seed=rng)
+    sim.q_table[:] = table.array
+    sim.train_agent()
+    slots.array[worker_id] = sim.q_table
+    visited = sim.visited
+
+    table.close()
+    slots.close()
+    return visited
+
+
+def merge_tables(table, slots, merge):
+    '''
+    Merge the workers' tables back into the shared table in place.
+        average: mean of the workers' tables
+        delta: shared table plus the sum of every worker's change
+    '''
+    if merge == 'average':
+        slots.mean(axis=0, out=table)
+    else:
+        table += (slots - table).sum(axis=0)
+
+
+def train_parallel(simulator, processes=None, sync_interval=1000, merge='average', seed=None):
+    '''
+    Train simulator over its num_games games spread across a process pool.
+    Every worker trains its own copy of the q-table for sync_interval games,
+    then the copies are merged into the shared table and redistributed.
+
+    :param simulator - Simulator whose q_table is trained in place.
+    :param processes - pool size, defaults to the number of cores.
+    :param sync_interval - games each worker plays between merges.
+    :param merge - 'average' or 'delta', see merge_tables.
+    :param seed - seed the workers' random streams are derived from, defaults
+                  to the simulator's own stream. Every worker and round gets an
+                  independent child stream.
+    :returns dict with the number of games, workers, syncs and wall time
+    '''
+    if merge not in MERGE_MODES:
+        raise ValueError('merge must be one of %s' % (MERGE_MODES,))
+
+    processes = processes or multiprocessing.cpu_count()
+    params = (simulator.alpha_value, simulator.gamma_val, simulator.epsilon_value)
+    streams = RandomStream(seed) if seed is not None else simulator.rng
+
+    table = SharedTable((NUM_STATES, 3))
+    slots = SharedTable((processes, NUM_STATES, 3))
+    table.array[:] = simulator.q_table
+
+    start = time.time()
+    remaining = simulator.num_games
+    syncs = 0
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            while remaining > 0:
+                # Split this round's games evenly, workers without games sit out
+                round_games = min(remaining, sync_interval * processes)
+                shares = [round_games // processes + (w < round_games % processes)
+                          for w in range(0, processes)]
+                jobs = [(table.name, slots.name, processes, w, shares[w], params, rng.generator)
+                        for w, rng in enumerate(streams.spawn(processes)) if shares[w] > 0]
+
+                for visited in pool.map(train_worker, jobs):
+                    simulator.visited |= visited
+
+                active = len(jobs)
+                merge_tables(table.array, slots.array[:active], merge)
+                remaining -= round_games
+                syncs += 1
+
+        simulator.q_table[:] = table.array
+    finally:
+        table.close()
+        table.unlink()
+        slots.close()
+        slots.unlink()
+
+    return {
+        'games': simulator.num_games,
+        'processes': processes,
+        'syncs': syncs,
+        'seconds': time.time() - start,
+    }
+
+
+def compare_with_serial(num_games, alpha_value, gamma_value, epsilon_value,
+                        processes=None, sync_interval=1000, merge='average', seed=None):
+    '''
+    Train the same configuration serially and in parallel.
+    :returns dict with both wall times and the speedup of the parallel mode
+    '''
+    serial = Simulator(num_games, alpha_value, gamma_value, epsilon_value, run=False, seed=seed)
+    start = time.time()
+    serial.train_agent()
+    serial_seconds = time.time() - start
+
+    parallel = Simulator(num_games, alpha_value, gamma_value, epsilon_value, run=False, seed=seed)
+    report = parallel.train_agent_parallel(processes, sync_interval, merge)
+
+    return {
+        'games': num_games,
+        'processes': report['processes'],
+        'serial_seconds': serial_seconds,
+        'parallel_seconds': report['seconds'],
+        'speedup': serial_seconds / report['seconds'],
+    }
+
+
+if __name__ == "__main__":
+    '''
+    Report the wall-clock speedup of parallel training over the serial path.
+    '''
+    report = compare_with_serial(20000, 0.4, 0.95, 0.04, seed=0)
+    for key in sorted(report):
+        print(key + ": " + str(report[key]))
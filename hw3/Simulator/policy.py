@@ -0,0 +1,169 @@
+import time
+
+import numpy as np
+
+from MDP.batch_mdp import encode_states, is_terminal, simulate_steps
+from MDP.mdp import MDP, GRID_SIZE, PADDLE_CELLS, state_index
+from MDP.random_stream import RandomStream
+from Simulator.simulator import Simulator
+
+
+def representative_states():
+    '''
+    One continuous state per discrete state, in q-table row order.
+    Positions sit at the center of their cell, velocities take typical values.
+    :returns tuple of the five continuous state arrays
+    '''
+    bx, by, vx, vy, py = np.meshgrid(np.arange(1, GRID_SIZE + 1),
+                                     np.arange(1, GRID_SIZE + 1),
+                                     np.array([-1, 1]),
+                                     np.array([-1, 0, 1]),
+                                     np.arange(0, PADDLE_CELLS),
+                                     indexing='ij')
+    return ((bx.ravel() - 0.5) / GRID_SIZE,
+            (by.ravel() - 0.5) / GRID_SIZE,
+            vx.ravel() * 0.04,
+            vy.ravel() * 0.04,
+            (py.ravel() + 0.5) * 0.8 / PADDLE_CELLS)
+
+
+def export_policy(q_table, seed=0):
+    '''
+    Compile a q-table to a flat policy array with one greedy action per
+    discrete state. Like Simulator.get_best_next_s, every action is scored by
+    the q-value of the state it leads to, starting from the representative
+    continuous state of each discrete state. Ties go to the lowest action.
+    The policy only sees the discrete state, so it can score below the full
+    lookahead, which works on the exact continuous state.
+
+    :param seed - seed for the velocity of representatives that hit the paddle.
+    :returns int8 array, policy[row] is the action for q-table row
+    '''
+    states = representative_states()
+    n = len(states[0])
+
+    q = np.empty((n, 3))
+    rng = np.random.default_rng(seed)
+    for a in range(0, 3):
+        ns, _ = simulate_steps(*states, actions=np.full(n, a), rng=rng)
+        terminal = is_terminal(ns[0], ns[1], ns[4])
+        q[:, a] = np.where(terminal, -1, q_table[encode_states(*ns), a])
+
+    policy = np.zeros(len(q_table), dtype=np.int8)
+    policy[:n] = np.argmax(q, axis=1)
+    return policy
+
+
+class PolicyAgent:
+    '''
+    Pong agent that serves a compiled policy.
+    Choosing an action is one discretization and one list lookup.
+    '''
+
+    def __init__(self, policy, seed=None):
+        '''
+        :param policy - array from export_policy.
+        :param seed - seed of the random stream games are played with.
+        '''
+        self.policy = policy
+        self.lookup = policy.tolist()
+        self.game_state = MDP(rng=RandomStream(seed))
+
+    @classmethod
+    def from_q_table(cls, q_table, seed=None):
+        return cls(export_policy(q_table), seed)
+
+    def choose_action(self, state):
+        '''
+        :param state MDP state
+        :return action selected
+        '''
+        return self.lookup[state_index(*state.continuous_state())]
+
+    def choose_actions(self, states):
+        '''
+        :param states tuple of the five continuous state arrays
+        :return int array of actions selected
+        '''
+        return self.policy[encode_states(*states)]
+
+    def play_game(self):
+        '''
+        Play a full pong game with the compiled policy.
+        :returns score total number of bounces from this run
+        '''
+        state = self.game_state.reset()
+        r = 0
+        b = 0
+        while r != -1:
+            r = state.simulate_one_time_step(self.choose_action(state))
+            if r == 1:
+                b += r
+
+        return b
+
+
+def record_states(simulator, frames):
+    '''
+    Collect the states seen while the simulator plays greedy games.
+    :returns list of MDP states
+    '''
+    states = []
+    while len(states) < frames:
+        state = MDP(rng=simulator.rng)
+        r = 0
+        while r != -1 and len(states) < frames:
+            ac_s = simulator.choose_action(state)
+            states.append(MDP(state.ball_x, state.ball_y, state.velocity_x, state.velocity_y,
+                              rng=simulator.rng))
+            states[-1].paddle_y = state.paddle_y
+            r = state.simulate_one_time_step(ac_s)
+
+    return states
+
+
+def benchmark_latency(simulator, agent, frames=20000):
+    '''
+    Time Simulator.choose_action against PolicyAgent.choose_action on the
+    same recorded frames.
+    :returns dict with microseconds per frame for both and the speedup
+    '''
+    epsilon_value = simulator.epsilon_value
+    simulator.epsilon_value = 0
+    states = record_states(simulator, frames)
+
+    start = time.perf_counter()
+    for state in states:
+        simulator.choose_action(state)
+    simulator_us = (time.perf_counter() - start) / frames * 1e6
+    simulator.epsilon_value = epsilon_value
+
+    start = time.perf_counter()
+    for state in states:
+        agent.choose_action(state)
+    agent_us = (time.perf_counter() - start) / frames * 1e6
+
+    return {
+        'frames': frames,
+        'simulator_us_per_frame': simulator_us,
+        'policy_us_per_frame': agent_us,
+        'speedup': simulator_us / agent_us,
+    }
+
+
+if __name__ == "__main__":
+    '''
+    Train a small agent, compile its policy and compare both agents.
+    '''
+    simulator = Simulator(20000, 0.4, 0.95, 0.04, run=False, seed=0)
+    simulator.train_agent()
+    agent = PolicyAgent.from_q_table(simulator.q_table, seed=0)
+
+    report = benchmark_latency(simulator, agent)
+    for key in sorted(report):
+        print(key + ": " + str(report[key]))
+
+    simulator.epsilon_value = 0
+    games = 1000
+    print("simulator bounces: " + str(np.mean([simulator.simulate_game(learn=False) for x in range(0, games)])))
+    print("policy bounces: " + str(np.mean([agent.play_game() for x in range(0, games)])))
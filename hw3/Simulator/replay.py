@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    '''
+    Fixed-capacity ring buffer of transitions for the Q-learner.
+    Every field lives in a preallocated NumPy array, so storing a transition
+    only writes into existing memory. A transition holds the q-table row and
+    action that were updated, the reward, and the rows of the three
+    successors used for the target, so targets are recomputed against the
+    current q-table on every replay.
+    '''
+
+    def __init__(self, capacity=100000, prioritized=False, alpha=0.6, rng=None):
+        '''
+        :param capacity - transitions kept, the oldest are overwritten first.
+        :param prioritized - sample in proportion to |TD error| ** alpha.
+        :param rng - numpy.random.Generator used for sampling.
+        '''
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity)
+        self.terminal = np.zeros(capacity, dtype=bool)
+        self.successors = np.zeros((capacity, 3), dtype=np.int64)
+        self.successor_terminal = np.zeros((capacity, 3), dtype=bool)
+
+        # Sum tree over priority ** alpha: leaves start at tree_size, every
+        # inner node n holds tree[2n] + tree[2n + 1], the root is tree[1]
+        self.tree_size = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.tree_size) if prioritized else None
+        self.max_priority = 1.0
+
+        self.added = 0
+
+    def __len__(self):
+        return min(self.added, self.capacity)
+
+    def add(self, row, action, reward, terminal, successors):
+        '''
+        Store one transition, overwriting the oldest once full.
+        :param successors - list of (q-table index, game-over flag) per action,
+                            as returned by Simulator.lookahead.
+        '''
+        i = self.added % self.capacity
+        self.rows[i] = row
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.terminal[i] = terminal
+        (self.successors[i, 0], self.successor_terminal[i, 0]), \
+            (self.successors[i, 1], self.successor_terminal[i, 1]), \
+            (self.successors[i, 2], self.successor_terminal[i, 2]) = successors
+        self.added += 1
+
+        # New transitions get the highest priority, so they are replayed soon
+        if self.prioritized:
+            node = i + self.tree_size
+            self.tree[node] = self.max_priority ** self.alpha
+            node //= 2
+            while node >= 1:
+                self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+                node //= 2
+
+    def sample(self, batch_size):
+        '''
+        :returns indices of batch_size stored transitions
+        '''
+        if not self.prioritized:
+            return self.rng.integers(0, len(self), batch_size)
+
+        # Walk down the sum tree for every draw at once
+        u = self.rng.random(batch_size) * self.tree[1]
+        node = np.ones(batch_size, dtype=np.int64)
+        while node[0] < self.tree_size:
+            left = self.tree[2 * node]
+            right = u >= left
+            u -= left * right
+            node = 2 * node + right
+        return np.minimum(node - self.tree_size, len(self) - 1)
+
+    def update_priorities(self, idx, td_error):
+        '''
+        Record the latest |TD error| of replayed transitions.
+        '''
+        if self.prioritized:
+            priorities = np.abs(td_error) + 1e-6
+            self.max_priority = max(self.max_priority, priorities.max())
+            self.set_priorities(idx, priorities)
+
+    def set_priorities(self, idx, priorities):
+        '''
+        Set the leaves of idx and refresh their ancestors level by level.
+        '''
+        node = idx + self.tree_size
+        self.tree[node] = priorities ** self.alpha
+        node = np.unique(node // 2)
+        while node[0] >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node = np.unique(node // 2)
@@ -1,27 +1,47 @@
 import numpy as np
-import random
-import copy
-from MDP.mdp import MDP
+from MDP.random_stream import RandomStream
+from MDP.mdp import MDP, NUM_STATES, simulate_step, state_index, hit_paddle
+from MDP.batch_mdp import BatchMDP, simulate_steps, encode_states, is_terminal
 
 
 class Simulator:
 
-    def __init__(self, num_games=0, alpha_value=0, gamma_value=0, epsilon_value=0):
+    def __init__(self, num_games=0, alpha_value=0, gamma_value=0, epsilon_value=0, run=True,
+                 seed=None):
         '''
         Setup the Simulator with the provided values.
         :param num_games - number of games to be trained on.
         :param alpha_value - 1/alpha_value is the decay constant.
         :param gamma_value - Discount Factor.
         :param epsilon_value - Probability value for the epsilon-greedy approach.
+        :param run - train and evaluate right away, see run().
+        :param seed - seed or numpy.random.Generator of every random draw made
+                      by this simulator, see MDP.random_stream.RandomStream.
         '''
         self.num_games = num_games
         self.epsilon_value = epsilon_value
         self.alpha_value = alpha_value
         self.gamma_val = gamma_value
-        self.q_table = np.zeros((10369, 3))
-        self.state_ref = {}
-        self.used_states = 0
+        self.q_table = np.zeros((NUM_STATES, 3))
+        self.visited = np.zeros(NUM_STATES, dtype=bool)
+        self.rng = RandomStream(seed)
+        self.lookahead_cache = (None, None)
+        self.game_state = MDP(rng=self.rng)
+        self.games_trained = 0
+        self.checkpoint_path = None
+        self.checkpoint_interval = 0
+        self.monitor = None
+        self.replay = None
+        self.replay_batch_size = 32
+        self.replay_every = 4
 
+        if run:
+            self.run()
+
+    def run(self):
+        '''
+        Train the agent, then evaluate it.
+        '''
         self.train_agent()
 
         # Agent Evaluation
@@ -29,12 +49,19 @@ class Simulator:
         self.epsilon_value = 0
         self.run_aggregate_games()
 
-    def run_aggregate_games(self):
+    def run_aggregate_games(self, processes=None):
         '''
         Play series of games with final Q-Table.
+        :param processes - when set, play the games with the frozen q-table
+                           across a process pool, see Simulator.evaluation.
         '''
         total_b = 0
         limit = 5000
+        if processes:
+            from Simulator.evaluation import evaluate
+            print(evaluate(self.q_table, limit, processes, self.rng.generator)['mean'])
+            return
+
         for x in range(0, limit):
             total_b += self.play_game()
 
@@ -48,7 +75,7 @@ class Simulator:
         '''
         ac_s = None
 
-        x = random.random()
+        x = self.rng.random()
         if x <= self.epsilon_value:
             ac_s = self.random_action()
         else:
@@ -62,14 +89,78 @@ class Simulator:
         '''
         Randomizes action selected
         '''
-        return random.randint(0, 2)
+        return self.rng.randint(0, 2)
 
     def train_agent(self):
         '''
-        Train the agent over a certain number of games.
+        Train the agent until it has been trained on num_games games.
+        A simulator restored from a checkpoint resumes where it stopped.
+        Saves a checkpoint every checkpoint_interval games when enabled and
+        reports to monitor when set, see Simulator.metrics.TrainingMonitor.
+        '''
+        monitor = self.monitor
+        if monitor is not None:
+            monitor.attach(self)
+
+        try:
+            for i in range(self.games_trained, self.num_games):
+                b = self.simulate_game()
+                self.games_trained += 1
+                if monitor is not None:
+                    monitor.game_finished(self, b)
+                if self.checkpoint_interval and self.games_trained % self.checkpoint_interval == 0:
+                    self.save(self.checkpoint_path)
+        finally:
+            # Also on an interrupted run, so no timing wrapper outlives it
+            if monitor is not None:
+                monitor.detach(self)
+
+    def enable_checkpoints(self, path, interval=10000):
+        '''
+        Checkpoint to path every interval games during train_agent.
+        '''
+        self.checkpoint_path = path
+        self.checkpoint_interval = interval
+
+    def save(self, path):
+        '''
+        Save the q-table and hyperparameters, see Simulator.checkpoint.
+        '''
+        from Simulator.checkpoint import save_checkpoint
+        save_checkpoint(self, path)
+
+    def train_agent_batch(self, num_envs=1000, rng=None):
+        '''
+        Train the agent over num_games games, playing num_envs of them at once
+        on a BatchMDP. Every game reads and writes the shared q-table; when
+        several games update the same entry in one step the last write wins.
+        :param num_envs - number of games simulated side by side.
+        :param rng - numpy.random.Generator for exploration and paddle bounces,
+                     defaults to the simulator's own.
         '''
-        for i in range(0, self.num_games):
-            self.simulate_game()
+        env = BatchMDP(num_envs, rng if rng is not None else self.rng.generator)
+        while env.games_completed < self.num_games:
+            env.reset_done()
+            actions = self.choose_actions(env.state(), env.rng)
+            rewards = env.step(actions)
+            self.update_q_table_batch(rewards, actions, env.state(), env.rng)
+
+    def train_agent_parallel(self, processes=None, sync_interval=1000, merge='average', seed=None):
+        '''
+        Train the agent over num_games games spread across a process pool.
+        See Simulator.parallel.train_parallel.
+        '''
+        from Simulator.parallel import train_parallel
+        return train_parallel(self, processes, sync_interval, merge, seed)
+
+    def train_agent_jit(self):
+        '''
+        Train the agent like train_agent with whole stretches of games run in
+        one numba-compiled call, learning exactly what train_agent would.
+        Uses train_agent when numba is not installed, see Simulator.jit.
+        '''
+        from Simulator.jit import train_jit
+        train_jit(self)
 
     def play_game(self):
         '''
@@ -78,13 +169,13 @@ class Simulator:
         b = self.simulate_game()
         return b
 
-    def simulate_game(self):
+    def simulate_game(self, learn=True):
         '''
         Simulate a full pong game given an state
-        :param state MDP State representing the initial state
+        :param learn - update the q-table after every step, False keeps it frozen.
         :returns score total number of bounces from this run
         '''
-        state = MDP()
+        state = self.game_state.reset()
         r = 0
         b = 0
         while r != -1:
@@ -92,31 +183,84 @@ class Simulator:
             r = state.simulate_one_time_step(ac_s)
             if r == 1:
                 b += r
-            self.update_q_table(r, ac_s, state)
+            if learn:
+                successors = self.update_q_table(r, ac_s, state)
+                if self.replay is not None:
+                    self.remember(r, ac_s, state, successors)
 
         return b
 
+    def enable_replay(self, capacity=100000, batch_size=32, replay_every=4, prioritized=False,
+                      rng=None):
+        '''
+        Keep transitions in a replay buffer and replay a mini-batch of
+        batch_size of them every replay_every training steps.
+        See Simulator.replay.ReplayBuffer.
+        '''
+        from Simulator.replay import ReplayBuffer
+        rng = rng if rng is not None else self.rng.generator
+        self.replay = ReplayBuffer(capacity, prioritized, rng=rng)
+        self.replay_batch_size = batch_size
+        self.replay_every = replay_every
+
+    def remember(self, r, a, s, successors):
+        '''
+        Store the transition just used by update_q_table, replay when due.
+        :param successors - the lookahead update_q_table returned; simulating
+                            s again would draw new paddle bounces.
+        '''
+        terminal = s.ball_x > 1 and not s.hit_paddle()
+        self.replay.add(self.index(s), a, r, terminal, successors)
+        if self.replay.added % self.replay_every == 0:
+            self.update_q_table_replay()
+
+    def update_q_table_replay(self):
+        '''
+        Q-Update Iterative Equation applied to a mini-batch of stored
+        transitions at once, with targets from the current q-table.
+        '''
+        replay = self.replay
+        idx = replay.sample(self.replay_batch_size)
+        rows = replay.rows[idx]
+        actions = replay.actions[idx]
+        successors = replay.successors[idx]
+
+        q = np.where(replay.terminal[idx], -1, self.q_table[rows, actions])
+        q_next = np.where(replay.successor_terminal[idx], -1, self.q_table[successors, [0, 1, 2]])
+        b_a = q_next.argmax(axis=1)
+        b_s_i = successors[np.arange(len(idx)), b_a]
+
+        td_error = replay.rewards[idx] + self.gamma_val * self.q_table[b_s_i, b_a] - q
+        self.q_table[rows, actions] = q + self.alpha_value * td_error
+        replay.update_priorities(idx, td_error)
+
     def update_q_table(self, r, a, s):
         '''
         Updates Q-Table based off Q-Update Iterative Equation
+        :returns the lookahead of s the update used, see lookahead
         '''
         q = self.q_v(s, a)
-        b_s_i, b_a = self.get_best_next_s(s)
+        successors = self.lookahead(s)
+        b_s_i, b_a = self.get_best_next_s(s, successors)
         new_q = q + self.alpha_value * (r + self.gamma_val * self.q_table[b_s_i][b_a] - q)
         self.q_table[self.index(s)][a] = new_q
+        return successors
+
+    @property
+    def used_states(self):
+        '''
+        Number of distinct discrete states that got a q-table row so far
+        '''
+        return int(np.count_nonzero(self.visited))
 
     def index(self, state):
         '''
-        Given a discretized state, get the reference index for q-table
-        if new state, establish new index in reference dictionary
+        Given a state, get the reference index for q-table
         :returns index index of state in q-table
         '''
-        d_state = state.discretize_state()
-        if d_state not in self.state_ref:
-            self.state_ref[d_state] = self.used_states
-            self.used_states += 1
-
-        return self.state_ref[d_state]
+        i = state_index(*state.continuous_state())
+        self.visited[i] = True
+        return i
 
     def q_v(self, state, action):
         '''
@@ -128,32 +272,100 @@ class Simulator:
 
         return self.q_table[self.index(state)][action]
 
-    def get_best_next_s(self, state):
+    def lookahead(self, state):
+        '''
+        Predict the successor of state for every action without copying it.
+        Successors that did not involve a random paddle bounce are cached, so
+        the lookahead done in update_q_table is reused by the next
+        choose_action on the same state.
+        :returns list of (q-table index, game-over flag) per action
+        '''
+        key = state.continuous_state()
+        cached_key, successors = self.lookahead_cache
+        if cached_key == key:
+            return successors
+
+        successors = []
+        randomized = False
+        for a in range(0, 3):
+            ns, r = simulate_step(*key, action_selected=a, rng=self.rng)
+            i = state_index(*ns)
+            terminal = ns[0] > 1 and not hit_paddle(ns[1], ns[4])
+            # Game-over successors only count as visited once they are picked
+            if not terminal:
+                self.visited[i] = True
+            successors.append((i, terminal))
+            randomized = randomized or r == 1
+
+        self.lookahead_cache = (None, None) if randomized else (key, successors)
+        return successors
+
+    def get_best_next_s(self, state, successors=None):
         '''
         Uses Q-Table to find optimal next step
+        :param successors - lookahead of state when already computed
         '''
-        ns0 = copy.deepcopy(state)
-        ns0.simulate_one_time_step(0)
-        ns1 = copy.deepcopy(state)
-        ns1.simulate_one_time_step(1)
-        ns2 = copy.deepcopy(state)
-        ns2.simulate_one_time_step(2)
-
-        q0 = self.q_v(ns0, 0)
-        q1 = self.q_v(ns1, 1)
-        q2 = self.q_v(ns2, 2)
-
-        if q0 > q1 and q0 > q2:
-            return self.index(ns0), 0
-        elif q1 > q0 and q1 > q2:
-            return self.index(ns1), 1
-        elif q2 > q0 and q2 > q1:
-            return self.index(ns2), 2
+        if successors is None:
+            successors = self.lookahead(state)
+        q = [-1 if terminal else self.q_table[i][a] for a, (i, terminal) in enumerate(successors)]
+
+        if q[0] > q[1] and q[0] > q[2]:
+            ac_s = 0
+        elif q[1] > q[0] and q[1] > q[2]:
+            ac_s = 1
+        elif q[2] > q[0] and q[2] > q[1]:
+            ac_s = 2
         else:
             ac_s = self.random_action()
-            if ac_s == 0:
-                return self.index(ns0), 0
-            elif ac_s == 1:
-                return self.index(ns1), 1
-            elif ac_s == 2:
-                return self.index(ns2), 2
+
+        i = successors[ac_s][0]
+        self.visited[i] = True
+        return i, ac_s
+
+    def choose_actions(self, states, rng):
+        '''
+        Epsilon greedy action selection for a batch of games
+        :param states tuple of the five continuous state arrays
+        :return int array of actions selected
+        '''
+        n = len(states[0])
+        _, actions = self.get_best_next_s_batch(states, rng)
+        explore = rng.random(n) <= self.epsilon_value
+        actions[explore] = rng.integers(0, 3, int(explore.sum()))
+        return actions
+
+    def update_q_table_batch(self, rewards, actions, states, rng):
+        '''
+        Q-Update Iterative Equation applied to a batch of games at once
+        '''
+        rows = encode_states(*states)
+        self.visited[rows] = True
+        q = np.where(is_terminal(states[0], states[1], states[4]), -1, self.q_table[rows, actions])
+        b_s_i, b_a = self.get_best_next_s_batch(states, rng)
+        new_q = q + self.alpha_value * (rewards + self.gamma_val * self.q_table[b_s_i, b_a] - q)
+        self.q_table[rows, actions] = new_q
+
+    def get_best_next_s_batch(self, states, rng):
+        '''
+        Vectorized get_best_next_s
+        :returns arrays of best successor indices and best actions
+        '''
+        n = len(states[0])
+        rows = np.empty((n, 3), dtype=np.int64)
+        terminal = np.empty((n, 3), dtype=bool)
+        q = np.empty((n, 3))
+        for a in range(0, 3):
+            ns, _ = simulate_steps(*states, actions=np.full(n, a), rng=rng)
+            rows[:, a] = encode_states(*ns)
+            terminal[:, a] = is_terminal(ns[0], ns[1], ns[4])
+            q[:, a] = np.where(terminal[:, a], -1, self.q_table[rows[:, a], a])
+        self.visited[rows[~terminal]] = True
+
+        # Ties have no strict maximum and are randomized
+        best = q.argmax(axis=1)
+        ties = (q == q.max(axis=1, keepdims=True)).sum(axis=1) > 1
+        best[ties] = rng.integers(0, 3, int(ties.sum()))
+
+        best_rows = rows[np.arange(n), best]
+        self.visited[best_rows] = True
+        return best_rows, best
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+
+from MDP.batch_mdp import encode_states, simulate_steps
+from MDP.mdp import GRID_SIZE, PADDLE_CELLS, NUM_DISCRETE_STATES, NUM_STATES
+from Simulator.simulator import Simulator
+
+
+# Speeds sampled for the discrete velocity buckets. A paddle hit changes
+# velocity_x by at most 0.015 and velocity_y by at most 0.03, so balls in play
+# rarely leave these ranges.
+MAX_VELOCITY_X = 0.08
+MAX_VELOCITY_Y = 0.08
+
+
+def sample_cells(samples, rng):
+    '''
+    Draw continuous states uniformly inside every discrete cell.
+    :param samples - states drawn per discrete state.
+    :returns tuple of the five continuous state arrays, shaped
+             (NUM_DISCRETE_STATES, samples) in q-table row order
+    '''
+    bx, by, vx, vy, py = np.meshgrid(np.arange(1, GRID_SIZE + 1),
+                                     np.arange(1, GRID_SIZE + 1),
+                                     np.array([-1, 1]),
+                                     np.array([-1, 0, 1]),
+                                     np.arange(0, PADDLE_CELLS),
+                                     indexing='ij')
+    shape = (NUM_DISCRETE_STATES, samples)
+    bx, by, vx, vy, py = [c.reshape(-1, 1) for c in (bx, by, vx, vy, py)]
+
+    # Cells are left-open, d_pos maps (k - 1, k] / 12 to cell k
+    ball_x = (bx - rng.random(shape)) / GRID_SIZE
+    ball_y = (by - rng.random(shape)) / GRID_SIZE
+    velocity_x = vx * rng.uniform(0.03, MAX_VELOCITY_X, shape)
+    velocity_y = np.where(vy == 0,
+                          rng.uniform(-0.015, 0.015, shape),
+                          vy * rng.uniform(0.015, MAX_VELOCITY_Y, shape))
+    paddle_y = (py + rng.random(shape)) * 0.8 / PADDLE_CELLS
+    return ball_x, ball_y, velocity_x, velocity_y, paddle_y
+
+
+def estimate_model(samples=64, rng=None):
+    '''
+    Estimate the discrete transition model by Monte Carlo sampling of the
+    continuous step from every discrete cell. A missed ball leads to the
+    absorbing TERMINAL_STATE.
+
+    :returns next_rows, rewards - arrays of shape (NUM_DISCRETE_STATES, 3, samples)
+    '''
+    rng = rng if rng is not None else np.random.default_rng()
+    states = [c.ravel() for c in sample_cells(samples, rng)]
+    n = len(states[0])
+
+    next_rows = np.empty((NUM_DISCRETE_STATES, 3, samples), dtype=np.int64)
+    rewards = np.empty((NUM_DISCRETE_STATES, 3, samples))
+    for a in range(0, 3):
+        ns, r = simulate_steps(*states, actions=np.full(n, a), rng=rng)
+        next_rows[:, a] = encode_states(*ns, terminal=r == -1).reshape(-1, samples)
+        rewards[:, a] = r.reshape(-1, samples)
+
+    return next_rows, rewards
+
+
+def bellman(v, next_rows, rewards, gamma_value):
+    '''
+    :returns optimal q-values of every discrete state under the sampled model
+    '''
+    return (rewards + gamma_value * v[next_rows]).mean(axis=2)
+
+
+def value_iteration(next_rows, rewards, gamma_value=0.95, tolerance=1e-6, max_iterations=10000):
+    '''
+    Vectorized value iteration over the sampled model.
+    :returns state values v, with v[TERMINAL_STATE] == 0
+    '''
+    v = np.zeros(NUM_STATES)
+    for i in range(0, max_iterations):
+        new_v = bellman(v, next_rows, rewards, gamma_value).max(axis=1)
+        delta = np.abs(new_v - v[:NUM_DISCRETE_STATES]).max()
+        v[:NUM_DISCRETE_STATES] = new_v
+        if delta < tolerance:
+            break
+
+    return v
+
+
+def prioritized_sweeping(next_rows, rewards, gamma_value=0.95, tolerance=1e-6, batch=256):
+    '''
+    Prioritized sweeping over the sampled model. Each sweep backs up the
+    batch states with the largest Bellman error, then recomputes the error of
+    their predecessors only.
+    :returns state values v, with v[TERMINAL_STATE] == 0
+    '''
+    # predecessors[starts[t]:starts[t + 1]] are the states that can reach t
+    sources = np.repeat(np.arange(NUM_DISCRETE_STATES), next_rows[0].size)
+    pairs = np.unique(np.stack([next_rows.ravel(), sources]), axis=1)
+    starts = np.searchsorted(pairs[0], np.arange(NUM_STATES + 1))
+    predecessors = pairs[1]
+
+    v = np.zeros(NUM_STATES)
+    error = np.abs(bellman(v, next_rows, rewards, gamma_value).max(axis=1))
+    while error.max() > tolerance:
+        top = np.argpartition(-error, batch)[:batch]
+        top = top[error[top] > tolerance]
+        v[top] = bellman(v, next_rows[top], rewards[top], gamma_value).max(axis=1)
+        error[top] = 0
+
+        preds = np.unique(np.concatenate([predecessors[starts[t]:starts[t + 1]] for t in top]))
+        error[preds] = np.abs(bellman(v, next_rows[preds], rewards[preds], gamma_value).max(axis=1)
+                              - v[preds])
+
+    return v
+
+
+def solve(gamma_value=0.95, samples=64, method='value_iteration', rng=None):
+    '''
+    Solve the discretized Pong MDP offline.
+    The result has the layout of Simulator.q_table, with the game-over row
+    left at zero, so a simulator can play with it directly.
+
+    :param method - 'value_iteration' or 'prioritized_sweeping'.
+    :returns q_table of shape (NUM_STATES, 3)
+    '''
+    next_rows, rewards = estimate_model(samples, rng)
+    if method == 'value_iteration':
+        v = value_iteration(next_rows, rewards, gamma_value)
+    elif method == 'prioritized_sweeping':
+        v = prioritized_sweeping(next_rows, rewards, gamma_value)
+    else:
+        raise ValueError('unknown method ' + method)
+
+    q_table = np.zeros((NUM_STATES, 3))
+    q_table[:NUM_DISCRETE_STATES] = bellman(v, next_rows, rewards, gamma_value)
+    return q_table
+
+
+if __name__ == "__main__":
+    '''
+    Compare the offline solution against online training.
+    '''
+    games = 1000
+    for method in ('value_iteration', 'prioritized_sweeping'):
+        start = time.time()
+        sim = Simulator(run=False, seed=0)
+        sim.q_table = solve(0.95, method=method, rng=np.random.default_rng(0))
+        seconds = time.time() - start
+        score = np.mean([sim.simulate_game(learn=False) for x in range(0, games)])
+        print(method + ": " + str(score) + " bounces, " + str(seconds) + " s")
+
+    start = time.time()
+    sim = Simulator(100000, 0.4, 0.95, 0.04, run=False, seed=0)
+    sim.train_agent()
+    seconds = time.time() - start
+    sim.epsilon_value = 0
+    score = np.mean([sim.simulate_game(learn=False) for x in range(0, games)])
+    print("online: " + str(score) + " bounces, " + str(seconds) + " s")
@@ -0,0 +1,243 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from MDP.mdp import MDP
+from MDP.random_stream import RandomStream
+from Simulator import jit
+from Simulator.policy import record_states
+from Simulator.simulator import Simulator
+
+
+# Every benchmark runs from fixed seeds, so repeated runs do identical work and
+# only the timings differ. Frames are recorded from a briefly trained agent, so
+# the per-step benchmarks see the states a learner actually visits. That agent
+# is never modified: every repeat gets a scratch copy of it, see
+# scratch_simulator, so neither earlier repeats nor earlier benchmarks change
+# the work a repeat does and --only runs compare with full runs.
+SEED = 0
+FRAMES = 20000
+PARAMS = (0.4, 0.95, 0.04)
+
+
+def trained_simulator(num_games=1000):
+    '''
+    :returns simulator trained for num_games games with the runner.py values
+    '''
+    simulator = Simulator(num_games, *PARAMS, run=False, seed=SEED)
+    simulator.train_agent()
+    return simulator
+
+
+def scratch_simulator(simulator):
+    '''
+    :returns new simulator seeded with SEED holding copies of the q-table and
+             visited mask of simulator, free to be trained by a benchmark
+    '''
+    scratch = Simulator(simulator.num_games, *PARAMS, run=False, seed=SEED)
+    scratch.q_table[:] = simulator.q_table
+    scratch.visited[:] = simulator.visited
+    return scratch
+
+
+def recorded_frames(simulator):
+    '''
+    :returns FRAMES states seen while simulator plays greedy games
+    '''
+    simulator.rng = RandomStream(SEED)
+    epsilon_value = simulator.epsilon_value
+    simulator.epsilon_value = 0
+    states = record_states(simulator, FRAMES)
+    simulator.epsilon_value = epsilon_value
+    return states
+
+
+def bench_simulate_one_time_step(simulator, states):
+    rng = RandomStream(SEED)
+    actions = [rng.randint(0, 2) for state in states]
+    state = MDP(rng=rng)
+
+    def run():
+        for a in actions:
+            if state.simulate_one_time_step(a) == -1:
+                state.reset()
+    return run, len(actions)
+
+
+def bench_discretize_state(simulator, states):
+    def run():
+        for state in states:
+            state.discretize_state()
+    return run, len(states)
+
+
+def bench_get_best_next_s(simulator, states):
+    def run():
+        for state in states:
+            simulator.get_best_next_s(state)
+    return run, len(states)
+
+
+def bench_update_q_table(simulator, states):
+    actions = [simulator.rng.randint(0, 2) for state in states]
+
+    def run():
+        for state, a in zip(states, actions):
+            simulator.update_q_table(0, a, state)
+    return run, len(states)
+
+
+def bench_simulate_game(simulator, states, games=500):
+    def run():
+        for x in range(0, games):
+            simulator.simulate_game()
+    return run, games
+
+
+def bench_training(num_games):
+    def bench(simulator, states):
+        trainee = Simulator(num_games, *PARAMS, run=False, seed=SEED)
+        return trainee.train_agent, num_games
+    return bench
+
+
+def bench_training_jit(num_games):
+    def bench(simulator, states):
+        # Compile outside the timed run
+        Simulator(1, *PARAMS, run=False, seed=SEED).train_agent_jit()
+        trainee = Simulator(num_games, *PARAMS, run=False, seed=SEED)
+        return trainee.train_agent_jit, num_games
+    return bench
+
+
+# name, benchmark, repeats; a benchmark gets a scratch simulator and the
+# recorded frames, and returns a callable doing the timed work and the number
+# of operations it performs
+BENCHMARKS = [
+    ('mdp.simulate_one_time_step', bench_simulate_one_time_step, 5),
+    ('mdp.discretize_state', bench_discretize_state, 5),
+    ('simulator.get_best_next_s', bench_get_best_next_s, 5),
+    ('simulator.update_q_table', bench_update_q_table, 5),
+    ('simulator.simulate_game', bench_simulate_game, 3),
+    ('train.1k_games', bench_training(1000), 3),
+    ('train.10k_games', bench_training(10000), 1),
+]
+
+# Without numba train_agent_jit is train_agent, whose timings must not be
+# saved, and compared, under the compiled name
+if jit.numba is not None:
+    BENCHMARKS.append(('train_jit.10k_games', bench_training_jit(10000), 3))
+
+
+def run_benchmarks(names=None):
+    '''
+    Run the benchmarks, every one from a fresh setup per repeat.
+    :param names - names of the benchmarks to run, defaults to all.
+    :returns dict with the environment and, per benchmark, the best and
+             median seconds per operation over its repeats
+    '''
+    simulator = trained_simulator()
+    states = recorded_frames(simulator)
+
+    results = {}
+    for name, bench, repeats in BENCHMARKS:
+        if names and name not in names:
+            continue
+        times = []
+        for x in range(0, repeats):
+            run, ops = bench(scratch_simulator(simulator), states)
+            start = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - start) / ops)
+        results[name] = {
+            'ops': ops,
+            'repeats': repeats,
+            'best': min(times),
+            'median': float(np.median(times)),
+        }
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': SEED,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    '''
+    Compare the best times of two benchmark runs.
+    :param threshold - relative slowdown above which a benchmark regressed.
+    :returns list of dicts with name, baseline, current, ratio and regressed,
+             for every benchmark present in both runs
+    '''
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        ratio = result['best'] / baseline['results'][name]['best']
+        rows.append({
+            'name': name,
+            'baseline': baseline['results'][name]['best'],
+            'current': result['best'],
+            'ratio': ratio,
+            'regressed': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def print_results(report):
+    for name, result in report['results'].items():
+        print('%-30s %12.3f us/op  (median %.3f, %d ops x %d)'
+              % (name, result['best'] * 1e6, result['median'] * 1e6, result['ops'], result['repeats']))
+
+
+def print_comparison(rows, threshold):
+    for row in rows:
+        print('%-30s %12.3f -> %12.3f us/op  %6.2fx%s'
+              % (row['name'], row['baseline'] * 1e6, row['current'] * 1e6, row['ratio'],
+                 '  REGRESSION' if row['regressed'] else ''))
+    print('%d of %d benchmarks slower than the baseline by more than %d%%'
+          % (sum(row['regressed'] for row in rows), len(rows), threshold * 100))
+
+
+if __name__ == "__main__":
+    '''
+    Run the benchmarks and save them as JSON, or compare against a baseline:
+        python benchmark.py --output baseline.json
+        python benchmark.py --compare baseline.json --threshold 0.1
+        python benchmark.py --compare baseline.json --current results.json
+    Exits with status 1 when a benchmark regressed.
+    '''
+    parser = argparse.ArgumentParser(description='Pong simulator benchmarks')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare against')
+    parser.add_argument('--current', help='compare these saved results instead of running')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--only', nargs='+', help='names of the benchmarks to run')
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            report = json.load(f)
+    else:
+        report = run_benchmarks(args.only)
+        print_results(report)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
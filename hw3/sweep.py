@@ -0,0 +1,134 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+
+import numpy as np
+
+from MDP.random_stream import RandomStream
+from Simulator.checkpoint import load_checkpoint
+from Simulator.simulator import Simulator
+
+
+FIELDS = ['config', 'alpha_value', 'gamma_value', 'epsilon_value', 'num_games',
+          'games_trained', 'score', 'stopped_early']
+
+
+def grid_space(alpha_values, gamma_values, epsilon_values, num_games):
+    '''
+    Every combination of the given values.
+    :returns list of configuration dicts
+    '''
+    return [{'alpha_value': a, 'gamma_value': g, 'epsilon_value': e, 'num_games': n}
+            for a, g, e, n in itertools.product(alpha_values, gamma_values, epsilon_values, num_games)]
+
+
+def random_space(count, alpha_range, gamma_range, epsilon_range, num_games, seed=None):
+    '''
+    count configurations drawn uniformly from the given (low, high) ranges.
+    :param num_games - list of game counts to choose from.
+    :returns list of configuration dicts
+    '''
+    rng = random.Random(seed)
+    return [{'alpha_value': rng.uniform(*alpha_range),
+             'gamma_value': rng.uniform(*gamma_range),
+             'epsilon_value': rng.uniform(*epsilon_range),
+             'num_games': rng.choice(num_games)}
+            for i in range(0, count)]
+
+
+def sweep_worker(args):
+    '''
+    Train one configuration up to games games, then score it on greedy games
+    with a frozen q-table. Training continues from the configuration's
+    checkpoint, so every rung only plays the new games. The checkpoint also
+    carries the random stream, so rng only seeds the first rung.
+    :returns (games trained, mean bounces)
+    '''
+    config, games, path, eval_games, rng = args
+
+    if os.path.exists(path + '.npz'):
+        sim = load_checkpoint(path)
+    else:
+        sim = Simulator(0, config['alpha_value'], config['gamma_value'], config['epsilon_value'],
+                        run=False, seed=rng)
+    sim.num_games = games
+    sim.train_agent()
+    sim.save(path)
+
+    sim.epsilon_value = 0
+    score = np.mean([sim.simulate_game(learn=False) for x in range(0, eval_games)])
+    return sim.games_trained, float(score)
+
+
+def run_sweep(configs, processes=None, rungs=4, eval_games=500, margin=0.25, seed=None):
+    '''
+    Train and score every configuration across a process pool.
+    Training happens in rungs, each one playing another 1/rungs of a
+    configuration's num_games. After every rung, configurations scoring more
+    than margin below the best score so far are stopped early.
+
+    :param configs - list of configuration dicts, see grid_space.
+    :param processes - pool size, defaults to the number of cores.
+    :param eval_games - greedy games played to score a configuration.
+    :param seed - seed every configuration's independent child stream is spawned from.
+    :returns list of result dicts with the FIELDS keys
+    '''
+    workdir = tempfile.mkdtemp(prefix='sweep')
+    results = [dict(config, config=i, games_trained=0, score=None, stopped_early=False)
+               for i, config in enumerate(configs)]
+    running = list(range(0, len(configs)))
+    streams = RandomStream(seed).spawn(len(configs))
+
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            for rung in range(1, rungs + 1):
+                jobs = [(configs[i],
+                         configs[i]['num_games'] * rung // rungs,
+                         os.path.join(workdir, str(i)),
+                         eval_games,
+                         streams[i].generator)
+                        for i in running]
+                for i, (games_trained, score) in zip(running, pool.map(sweep_worker, jobs)):
+                    results[i]['games_trained'] = games_trained
+                    results[i]['score'] = score
+
+                if rung < rungs:
+                    best = max(results[i]['score'] for i in running)
+                    behind = [i for i in running if results[i]['score'] < best * (1 - margin)]
+                    for i in behind:
+                        results[i]['stopped_early'] = True
+                    running = [i for i in running if i not in behind]
+    finally:
+        shutil.rmtree(workdir)
+
+    return results
+
+
+def write_results(results, path):
+    '''
+    Write the results table as JSON or, for any other extension, as CSV.
+    '''
+    with open(path, 'w') as f:
+        if path.endswith('.json'):
+            json.dump(results, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    '''
+    Sweep around the values in runner.py and record the results.
+    '''
+    configs = grid_space([0.4, 0.6, 0.7], [0.95, 0.99], [0.02, 0.04, 0.06], [100000])
+    results = run_sweep(configs, seed=0)
+    write_results(results, 'sweep_results.csv')
+
+    for result in sorted(results, key=lambda r: -r['score']):
+        print(result)
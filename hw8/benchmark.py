@@ -0,0 +1,126 @@
+# Python Lib Imports
+import time
+
+import numpy as np
+# Local Import
+import kmeans
+import lib
+
+
+def blobs(n, d, k, rng, spread=1.0):
+    '''
+    Synthetic Data
+        n samples around k Gaussian centers drawn in a [0, 10]^d box
+
+    :returns: (n, d) array of samples
+    '''
+    centers = rng.uniform(0, 10, (k, d))
+    return centers[rng.integers(0, k, n)] + rng.normal(0, spread, (n, d))
+
+
+def benchmark_init(data, k, runs=100, iterations=100, seed=0, inits=None):
+    '''
+    Seeding Benchmark
+        Runs k_means from every seeding to convergence. A run counts as good
+        when its SS_Total is within 1% of the best one seen across all runs,
+        restarts is the expected number of runs until the first good one.
+
+    :returns: dict per init of mean SS_Total, good run fraction, restarts,
+              mean iterations, and seeding and total milliseconds per run
+    '''
+    inits = inits or list(kmeans.INITS)
+    runs_by_init = {}
+    for init in inits:
+        rng = np.random.default_rng(seed)
+        runs_by_init[init] = []
+        for r in range(0, runs):
+            start = time.perf_counter()
+            centroids = kmeans.initial_centroids(data, k, rng, init)
+            seeded = time.perf_counter()
+            result = kmeans.k_means(data, k, iterations, rng, centroids=centroids)
+            runs_by_init[init].append((result, seeded - start, time.perf_counter() - start))
+
+    best = min(result.ss_total for runs in runs_by_init.values() for result, _, _ in runs)
+    report = {}
+    for init, runs in runs_by_init.items():
+        good = np.mean([result.ss_total <= best * 1.01 for result, _, _ in runs])
+        report[init] = {
+            'ss_total': np.mean([result.ss_total for result, _, _ in runs]),
+            'good': good,
+            'restarts': 1 / good if good > 0 else float('inf'),
+            'iterations': np.mean([result.iterations for result, _, _ in runs]),
+            'seed_ms': np.mean([seconds for _, seconds, _ in runs]) * 1e3,
+            'total_ms': np.mean([seconds for _, _, seconds in runs]) * 1e3,
+        }
+    return report
+
+
+def benchmark_elkan(data, ks, iterations=100, seed=0):
+    '''
+    Elkan Benchmark
+        Runs k_means with and without accelerate from the same k-means++
+        seeding and checks both give the same clusters
+
+    :returns: dict per k of distance evaluations and seconds of both
+              methods, the fraction of evaluations saved and whether the
+              results are identical
+    '''
+    report = {}
+    for k in ks:
+        runs = []
+        for accelerate in [False, True]:
+            start = time.perf_counter()
+            result = kmeans.k_means(data, k, iterations, np.random.default_rng(seed),
+                                    init='k-means++', accelerate=accelerate)
+            runs.append((result, time.perf_counter() - start))
+        (exact, exact_seconds), (elkan, elkan_seconds) = runs
+        report[k] = {
+            'exact_evaluations': exact.evaluations,
+            'elkan_evaluations': elkan.evaluations,
+            'saved': 1 - elkan.evaluations / float(exact.evaluations),
+            'exact_seconds': exact_seconds,
+            'elkan_seconds': elkan_seconds,
+            'identical': exact.ss_total == elkan.ss_total
+                         and np.array_equal(exact.assignment, elkan.assignment),
+        }
+    return report
+
+
+def print_elkan_report(title, report):
+    print(title)
+    print('%5s %14s %14s %7s %9s %9s %10s'
+          % ('k', 'exact evals', 'elkan evals', 'saved', 'exact s', 'elkan s', 'identical'))
+    for k, row in report.items():
+        print('%5d %14d %14d %7.3f %9.3f %9.3f %10s'
+              % (k, row['exact_evaluations'], row['elkan_evaluations'], row['saved'],
+                 row['exact_seconds'], row['elkan_seconds'], row['identical']))
+
+
+def print_report(title, report):
+    print(title)
+    print('%-10s %12s %6s %9s %7s %9s %9s'
+          % ('init', 'SS_Total', 'good', 'restarts', 'itrs', 'seed ms', 'total ms'))
+    for init, row in report.items():
+        print('%-10s %12.3f %6.2f %9.2f %7.1f %9.3f %9.3f'
+              % (init, row['ss_total'], row['good'], row['restarts'], row['iterations'],
+                 row['seed_ms'], row['total_ms']))
+
+
+if __name__ == "__main__":
+    '''
+    Compare random, k-means++ and k-means|| seeding on the iris data and on
+    larger synthetic data, then the distance evaluations Elkan's method
+    saves as k grows
+    '''
+    data = lib.load_dataset()[0]
+    for k in [3, 4, 5]:
+        print_report('iris, k=%d' % k, benchmark_init(data, k, runs=200))
+
+    rng = np.random.default_rng(0)
+    for n, d, k in [(20000, 8, 10), (20000, 8, 25)]:
+        print_report('blobs n=%d d=%d, k=%d' % (n, d, k),
+                     benchmark_init(blobs(n, d, k, rng), k, runs=20))
+
+    print_elkan_report('elkan, iris', benchmark_elkan(data, [3, 5, 10, 20]))
+    print_elkan_report('elkan, blobs n=50000 d=8',
+                       benchmark_elkan(blobs(50000, 8, 50, rng), [5, 20, 50, 100, 200]))
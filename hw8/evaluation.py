@@ -0,0 +1,184 @@
+# Python Lib Imports
+from collections import namedtuple
+
+import numpy as np
+
+
+Scores = namedtuple('Scores', ['contingency', 'matches', 'f_scores', 'weighted_f1', 'purity',
+                               'ari', 'nmi'])
+Scores.__doc__ = '''
+Clustering Scores against known labels
+    contingency: (k, L) samples of every cluster per label
+    matches: array of (label index, cluster index) pairs, one per label
+             while there are clusters left
+    f_scores: (L,) F1 of every label against its matched cluster, 0 when
+              unmatched
+    weighted_f1: F1 averaged over the labels, weighted by label size
+    purity: fraction of samples in their cluster's most common label
+    ari: adjusted Rand index
+    nmi: normalized mutual information, arithmetic mean normalization
+'''
+
+
+def contingency(assignment, labels, k=None, n_labels=None):
+    '''
+    Contingency Matrix
+        One bincount over the sample rows, so duplicate samples count once
+        each
+
+    :param assignment: (n,) cluster index of every sample
+    :param labels: (n,) label index of every sample
+    :param k: number of clusters, defaults to the largest index + 1
+    :param n_labels: number of labels, defaults to the largest index + 1
+    :returns: (k, n_labels) int array, samples of every cluster per label
+    '''
+    assignment = np.asarray(assignment, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.int64)
+    k = k if k is not None else int(assignment.max(initial=-1)) + 1
+    n_labels = n_labels if n_labels is not None else int(labels.max(initial=-1)) + 1
+    counts = np.bincount(assignment * n_labels + labels, minlength=k * n_labels)
+    return counts.reshape(k, n_labels)
+
+
+def linear_assignment(weights):
+    '''
+    Hungarian Algorithm
+        Shortest augmenting paths with row and column potentials, O(r^2 c)
+        for r <= c. Every row of the smaller side is matched.
+
+    :param weights: (r, c) array of pair weights
+    :returns: (rows, cols) index arrays of the matching with the largest
+              total weight, sorted by row
+    '''
+    weights = np.asarray(weights, dtype=float)
+    transposed = weights.shape[0] > weights.shape[1]
+    cost = -(weights.T if transposed else weights)
+    n, m = cost.shape
+
+    # Index 0 is a virtual column, p[j] is the 1-based row matched to column j
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while p[j0] != 0:
+            used[j0] = True
+            i0 = p[j0]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = ~used[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            free = np.flatnonzero(~used[1:]) + 1
+            j1 = free[np.argmin(minv[free])]
+            delta = minv[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def f_score_matrix(counts):
+    '''
+    :param counts: (k, L) contingency matrix
+    :returns: (k, L) F1 of every label against every cluster
+    '''
+    correct = counts.astype(float)
+    total = counts.sum(1)[:, None] + counts.sum(0)[None, :]
+    # F1 = 2 * precision * recall / (precision + recall) = 2 * correct / total
+    return np.divide(2 * correct, total, out=np.zeros_like(correct), where=total > 0)
+
+
+def comb2(x):
+    return x * (x - 1) / 2.0
+
+
+def adjusted_rand_index(counts):
+    '''
+    :param counts: (k, L) contingency matrix
+    :returns: adjusted Rand index, 1.0 when both partitions are trivial
+    '''
+    n = counts.sum()
+    index = comb2(counts).sum()
+    rows = comb2(counts.sum(1)).sum()
+    cols = comb2(counts.sum(0)).sum()
+    expected = rows * cols / comb2(n) if n > 1 else 0.0
+    maximum = (rows + cols) / 2.0
+    if maximum == expected:
+        return 1.0
+    return float((index - expected) / (maximum - expected))
+
+
+def entropy(counts):
+    p = counts[counts > 0] / float(counts.sum())
+    return float(-(p * np.log(p)).sum())
+
+
+def normalized_mutual_info(counts):
+    '''
+    :param counts: (k, L) contingency matrix
+    :returns: mutual information over the mean of both entropies, 1.0 when
+              both partitions are trivial
+    '''
+    n = float(counts.sum())
+    h_clusters = entropy(counts.sum(1))
+    h_labels = entropy(counts.sum(0))
+    if h_clusters == 0 and h_labels == 0:
+        return 1.0
+
+    joint = counts / n
+    outer = np.outer(counts.sum(1), counts.sum(0)) / n ** 2
+    nonzero = counts > 0
+    mutual_info = (joint[nonzero] * np.log(joint[nonzero] / outer[nonzero])).sum()
+    return float(mutual_info / ((h_clusters + h_labels) / 2.0))
+
+
+def evaluate(assignment, labels, k=None, n_labels=None):
+    '''
+    Scores a clustering against known labels
+        Labels are matched one-to-one to the clusters maximizing the
+        weighted F1, so any k works against any number of labels. Only the
+        assignment and label vectors are read, cluster groups are untouched.
+
+    :param assignment: (n,) cluster index of every sample
+    :param labels: (n,) label index of every sample
+    :param k: number of clusters, see contingency
+    :param n_labels: number of labels, see contingency
+    :returns: Scores
+    '''
+    counts = contingency(assignment, labels, k, n_labels)
+    label_count = counts.sum(0)
+    n = float(label_count.sum())
+
+    f_scores = f_score_matrix(counts)
+    clusters, matched = linear_assignment(f_scores * label_count)
+    order = np.argsort(matched, kind='stable')
+    matches = [(int(matched[i]), int(clusters[i])) for i in order]
+
+    label_f_scores = np.zeros(counts.shape[1])
+    label_f_scores[matched] = f_scores[clusters, matched]
+
+    return Scores(
+        contingency=counts,
+        matches=matches,
+        f_scores=label_f_scores,
+        weighted_f1=float((label_f_scores * label_count).sum() / n) if n else 0.0,
+        purity=float(counts.max(1, initial=0).sum() / n) if n else 0.0,
+        ari=adjusted_rand_index(counts),
+        nmi=normalized_mutual_info(counts),
+    )
@@ -2,83 +2,49 @@
 import matplotlib.pyplot as pyplot
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
-import random
 # Local Import
+import evaluation
+import kmeans
 import lib
+import parallel
 
 
-def setup_clusters(k, iris_samples):
+def setup_clusters(k, iris_samples, rng=None, init='random'):
     '''
     Initialize clusters
         Randomly chooses initial centroids for clusters
 
     :param k: number of initial clusters
     :param iris_samples: data
+    :param rng: numpy Generator, defaults to a fresh one
+    :param init: 'random', 'k-means++' or 'k-means||', see kmeans.initial_centroids
     :returns: array of clusters
     '''
-    init_centroids = []
-    clusters = []
-    for i in range(0, k):
-        j = lib.randomize(len(iris_samples))
-        while j in init_centroids:
-            j = lib.randomize(len(iris_samples))
-        init_centroids.append(j)
-        new_cluster = lib.Cluster(lib.Iris.from_iris(iris_samples[j]))
-        clusters.append(new_cluster)
+    rng = rng if rng is not None else np.random.default_rng()
+    centroids = kmeans.initial_centroids(lib.to_array(iris_samples), k, rng, init)
+    return [lib.Cluster(lib.Iris.from_row(centroid)) for centroid in centroids]
 
-    return clusters
 
-
-def k_means(k, iterations, iris_samples):
+def k_means(k, iterations, iris_samples, rng=None, tolerance=0.0, init='random'):
     '''
     K-Means Algorithm
+        See kmeans.k_means, the samples are clustered as one array
 
     :param k: number of clusters
     :param iterations: max iterations
-    :param iris_samples: data
-    :returns: ss_total score
+    :param iris_samples: (n, 4) sample array shared by every call, or Iris samples
+    :param rng: numpy Generator for initial centroids and ties
+    :param tolerance: centroid shift to stop at, see kmeans.k_means
+    :param init: seeding of the initial centroids, see setup_clusters
+    :returns: ss_total score, array of clusters, iterations used and the
+              reason the run stopped
     '''
-    iris_samples, iris_labels = lib.import_data()
-
-    clusters = setup_clusters(k, iris_samples)
-    for i in range(0, iterations):
-        # Reset Samples
-        for cluster in clusters:
-            cluster.clear_samples()
-
-        # Cluster Samples
-        for sample in iris_samples:
-            closest = -1.0
-            cluster_idx = 0
-            for j in range(0, len(clusters)):
-                cluster_dist = sample.distance(clusters[j].centroid)
-                if cluster_dist < closest or closest == -1:
-                    # New Closest Cluster
-                    closest = cluster_dist
-                    cluster_idx = j
-                elif cluster_dist == closest:
-                    # Randomize Ties
-                    cluster_idxs = [cluster_idx, j]
-                    cluster_idx = cluster_idxs[lib.randomize(2)]
-            clusters[cluster_idx].add_sample(sample)
-
-        # Update Centroids
-        to_remove = []
-        for cluster in clusters:
-            if len(cluster.samples) == 0:
-                to_remove.append(cluster)
-                continue
-            cluster.update_centroid()
-
-        # Vanishing Clusters
-        for cluster in to_remove:
-            clusters.remove(cluster)
-
-    total_ss_total = 0.0
-    for cluster in clusters:
-        total_ss_total += cluster.get_ss_total()
-
-    return total_ss_total, clusters
+    data = lib.to_array(iris_samples)
+
+    result = kmeans.k_means(data, k, iterations, rng, tolerance=tolerance, init=init)
+    clusters = lib.Cluster.from_assignment(data, result.centroids, result.assignment, lib.Iris)
+
+    return result.ss_total, clusters, result.iterations, result.stop_reason
 
 
 def graph_a(best_scores, labels):
@@ -98,167 +64,99 @@ def graph_a(best_scores, labels):
     pyplot.savefig('graph_a.png', bbox_inches='tight')
 
 
-def part_a(iris_samples):
+def part_a(iris_samples, processes=None, seed=None, init='random'):
     '''
     Part A per Problem Statement
-
-    :returns: Best Clusters for each combination of k's and itr's
+        The 4 restarts of every combination run in parallel, see
+        parallel.run_restarts
+
+    :param iris_samples: (n, 4) sample array
+    :param processes: pool size, defaults to the number of cores
+    :param seed: seed of the restarts, fresh entropy if None
+    :param init: seeding of the initial centroids, see setup_clusters
+    :returns: Best Clusters for each combination of k's and itr's, their
+              labels and their (n,) assignment vectors
     '''
     print("Part A")
     ks = [3, 4, 5]
     # ks = [3]
     itrs = [5, 10, 20]
+    restarts = 4
+    configs = [(k, itr) for k in ks for itr in itrs]
     labels = []
 
     best_scores = []
     best_clusters = []
-
-    for k in ks:
-        for itr in itrs:
-            best_ss_total = -1
-            best_cluster = lib.Cluster(lib.Iris())
-
-            print(str(k) + ":" + str(itr))
-            for i in range(0, 4):
-                ss_total, clusters = k_means(k, itr, iris_samples)
-                print("->" + str(ss_total))
-                if ss_total < best_ss_total or best_ss_total == -1:
-                    best_ss_total = ss_total
-                    best_cluster = clusters
-
-            best_scores.append(best_ss_total)
-            best_clusters.append(best_cluster)
-            labels.append(str(k) + "-" + str(itr))
+    best_assignments = []
+
+    data = lib.to_array(iris_samples)
+    all_results = parallel.run_restarts(data, configs, restarts, processes, seed, init=init)
+    for (k, itr), results in zip(configs, all_results):
+        print(str(k) + ":" + str(itr))
+        for result in results:
+            print("->" + str(result.ss_total) + " (" + str(result.iterations) + " itrs, "
+                  + result.stop_reason + ")")
+
+        best = parallel.best_result(results)
+        best_scores.append(best.ss_total)
+        best_clusters.append(lib.Cluster.from_assignment(data, best.centroids, best.assignment,
+                                                          lib.Iris))
+        best_assignments.append(best.assignment)
+        labels.append(str(k) + "-" + str(itr))
 
     graph_a(best_scores, labels)
 
-    return best_clusters, labels
+    return best_clusters, labels, best_assignments
 
 
-def find_primary_clusters(clusters, iris_labels):
+def find_primary_clusters(clusters, assignments, labels, label_names):
     '''
     Finds the best clusters for every label
-    Assigns cluster to label based off the highest overall percentage
-        Removes assigned cluster from options, then repeats for labels
+        Scores every group with evaluation.evaluate, which matches labels to
+        clusters with the Hungarian algorithm. The groups are not modified.
 
     :param clusters: best cluster groups
-    :param iris_labels: dictionary of sample to label
-    :returns: dictionary label to cluster from every group
+    :param assignments: (n,) assignment vector of every group
+    :param labels: (n,) label index of every sample
+    :param label_names: array of label names
+    :returns: evaluation.Scores of every group
     '''
-    primary_cluster_groups = []
-    for cluster_group in clusters:
-        labels = ['Iris-setosa', 'Iris-versicolor', 'Iris-virginica']
-
-        cluster_percentages = []
-        for cluster in cluster_group:
-            # Count each label
-            cluster_count = {labels[0]: 0, labels[1]: 0, labels[2]: 0}
-            for sample in cluster.samples:
-                cluster_count[iris_labels[str(sample)]] += 1
-            # Get Percentages
-            for key in labels:
-                cluster_count[key] /= len(cluster.samples)
-
-            cluster_percentages.append(cluster_count)
-
-        primary_clusters = {}
-
-        # Get Best Clusters
-        best_percentage = 0.0
-        best_cluster = 0
-        best_label = ''
-        for label in labels:
-            for i in range(0, len(cluster_percentages)):
-                if cluster_percentages[i][label] > best_percentage:
-                    best_percentage = cluster_percentages[i][label]
-                    best_cluster = i
-                    best_label = label
-        primary_clusters[best_label] = cluster_group[best_cluster]
-        del cluster_percentages[best_cluster]
-        del cluster_group[best_cluster]
-        labels.remove(best_label)
-
-        best_percentage = 0.0
-        best_cluster = 0
-        best_label = ''
-        for label in labels:
-            for i in range(0, len(cluster_percentages)):
-                if cluster_percentages[i][label] > best_percentage:
-                    best_percentage = cluster_percentages[i][label]
-                    best_cluster = i
-                    best_label = label
-        primary_clusters[best_label] = cluster_group[best_cluster]
-        del cluster_percentages[best_cluster]
-        del cluster_group[best_cluster]
-        labels.remove(best_label)
-
-        best_percentage = 0.0
-        best_cluster = 0
-        best_label = ''
-        for label in labels:
-            for i in range(0, len(cluster_percentages)):
-                if cluster_percentages[i][label] > best_percentage:
-                    best_percentage = cluster_percentages[i][label]
-                    best_cluster = i
-                    best_label = label
-        primary_clusters[best_label] = cluster_group[best_cluster]
-        del cluster_percentages[best_cluster]
-        del cluster_group[best_cluster]
-        labels.remove(best_label)
-
-        primary_cluster_groups.append(primary_clusters)
-
-    return primary_cluster_groups
-
-
-def calculate_f_score(primary_cluster_groups, iris_labels, cluster_group_labels):
+    return [evaluation.evaluate(assignment, labels, len(cluster_group), len(label_names))
+            for cluster_group, assignment in zip(clusters, assignments)]
+
+
+def calculate_f_score(clusters, primary_cluster_groups, label_names, cluster_group_labels):
     '''
     Calculate F1 Score
 
-    :param primary_cluster_groups: dictionary label to cluster from every group
-    :param iris_labels: dictionary of sample to label
+    :param clusters: best cluster groups
+    :param primary_cluster_groups: evaluation.Scores of every group
+    :param label_names: array of label names
     :param cluster_group_labels: labels of possible k-means combinations
-    :returns: best cluster based of f score
+    :returns: dictionary label to cluster of the best group based of f score
     '''
-    # Count number per species in data
-    labels = ['Iris-setosa', 'Iris-versicolor', 'Iris-virginica']
-    cluster_count = {labels[0]: 0, labels[1]: 0, labels[2]: 0}
-    for label in iris_labels.values():
-        cluster_count[label] += 1
-
     # Get best average F1 Score
     best_avg_f_score = 0.0
     best_cluster_group_idx = 0
     for i in range(0, len(primary_cluster_groups)):
         print(cluster_group_labels[i])
 
-        cluster_group = primary_cluster_groups[i]
-        avg_f_score = 0.0
-        # Iterate over each label
-        for label in cluster_group.keys():
-            cur_cluster = cluster_group[label]
-            correct_elements = 0.0
-
-            for sample in cur_cluster.samples:
-                if iris_labels[str(sample)] == label:
-                    correct_elements += 1
-
-            # Calculate F1 Score
-            recall = correct_elements / cluster_count[label]
-            precision = correct_elements / len(cur_cluster.samples)
-            f_score = 2 * precision * recall / (precision + recall)
-            avg_f_score += f_score * cluster_count[label] / len(iris_labels)
-
-            print(label + ":" + str(f_score))
+        scores = primary_cluster_groups[i]
+        for label, cluster in scores.matches:
+            print(str(label_names[label]) + ":" + str(scores.f_scores[label]))
 
+        avg_f_score = scores.weighted_f1
         print("Average F1 Score: " + str(avg_f_score))
+        print("Purity: %f ARI: %f NMI: %f" % (scores.purity, scores.ari, scores.nmi))
         # Store best average f score
         if avg_f_score > best_avg_f_score:
             best_avg_f_score = avg_f_score
             best_cluster_group_idx = i
 
     print("Best Average F1 Score:" + str(best_avg_f_score))
-    best_cluster_group = primary_cluster_groups[best_cluster_group_idx]
+    best_cluster_group = {label_names[label]: clusters[best_cluster_group_idx][cluster]
+                          for label, cluster
+                          in primary_cluster_groups[best_cluster_group_idx].matches}
     print(best_cluster_group_idx)
     for cluster in best_cluster_group.values():
         print(cluster.centroid)
@@ -355,30 +253,35 @@ def graph_b(best_cluster_group):
     pyplot.savefig('swplpw.png')
 
 
-def part_b(clusters, cluster_group_labels, iris_samples, iris_labels):
+def part_b(clusters, cluster_group_labels, assignments, labels, label_names):
     '''
     Part B per Problem Statement
+        Samples are identified by row index, labels and assignments are
+        aligned with the rows of the sample array
     '''
     print("Part B")
-    primary_cluster_groups = find_primary_clusters(clusters, iris_labels)
+    primary_cluster_groups = find_primary_clusters(clusters, assignments, labels, label_names)
 
-    best_cluster_group = calculate_f_score(primary_cluster_groups, iris_labels, cluster_group_labels)
+    best_cluster_group = calculate_f_score(clusters, primary_cluster_groups, label_names,
+                                           cluster_group_labels)
 
     graph_b(best_cluster_group)
 
 
-def main():
-    ''' Main '''
-    random.seed()
+def main(seed=None):
+    '''
+    Main
 
-    # Import Data
-    iris_samples, iris_labels = lib.import_data()
+    :param seed: seed of the K-Means restarts, fresh entropy if None
+    '''
+    # Import Data, parsed once and shared by every K-Means run
+    data, labels, label_names = lib.load_dataset()
 
     # Part A
-    clusters, cluster_group_labels = part_a(iris_samples)
+    clusters, cluster_group_labels, assignments = part_a(data, seed=seed)
 
     # Part B
-    part_b(clusters, cluster_group_labels, iris_samples, iris_labels)
+    part_b(clusters, cluster_group_labels, assignments, labels, label_names)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,441 @@
+# Python Lib Imports
+from collections import namedtuple
+
+import numpy as np
+
+
+# Why a k_means run stopped
+MAX_ITERATIONS = 'max_iterations'
+CONVERGED = 'converged'
+TOLERANCE = 'tolerance'
+
+Result = namedtuple('Result', ['ss_total', 'centroids', 'assignment', 'iterations', 'stop_reason',
+                               'evaluations'])
+Result.__doc__ = '''
+K-Means Result
+    ss_total: SS_Total of the final clusters
+    centroids: (k', d) array of centroids
+    assignment: (n,) cluster index of every sample
+    iterations: assignment and update passes run
+    stop_reason: MAX_ITERATIONS, CONVERGED or TOLERANCE
+    evaluations: distances computed to assign the samples
+'''
+
+# Slack on the Elkan bound tests, so rounding in the bounds never skips a
+# centroid the exact distances would tie with
+BOUND_SLACK = 1 + 1e-10
+
+
+def squared_distances(data, centroids, block=1 << 16):
+    '''
+    Squared Euclidean Distances
+        Every sample to every centroid by broadcasting, in blocks of samples
+        holding about block differences each. Exact differences keep ties
+        between equidistant centroids exact, which matters for the 0.1 cm
+        grid of the iris measurements.
+
+    :param data: (n, d) array of samples
+    :param centroids: (k, d) array of centroids
+    :returns: (n, k) array of squared distances
+    '''
+    n, d = data.shape
+    d2 = np.empty((n, len(centroids)))
+    rows = max(1, block // max(1, len(centroids) * d))
+    for start in range(0, n, rows):
+        diff = data[start:start + rows, None, :] - centroids[None, :, :]
+        np.einsum('ikd,ikd->ik', diff, diff, out=d2[start:start + rows])
+    return d2
+
+
+def assign(data, centroids, rng=None):
+    '''
+    Assigns every sample to its closest centroid
+
+    :param data: (n, d) array of samples
+    :param centroids: (k, d) array of centroids
+    :param rng: numpy Generator to randomize ties, None assigns ties to the
+                lowest cluster index
+    :returns: (n,) int array of cluster indices
+    '''
+    return assign_distances(squared_distances(data, centroids), rng)
+
+
+def assign_distances(d2, rng=None):
+    '''
+    Closest centroid of every sample from its squared distances
+
+    :param d2: (n, k) array of squared distances
+    :param rng: see assign
+    :returns: (n,) int array of cluster indices
+    '''
+    assignment = d2.argmin(axis=1)
+    if rng is None:
+        return assignment
+
+    # Randomize Ties
+    ties = d2 == d2[np.arange(len(d2)), assignment][:, None]
+    tied = np.flatnonzero(ties.sum(axis=1) > 1)
+    if len(tied) > 0:
+        assignment[tied] = (ties[tied] * rng.random((len(tied), ties.shape[1]))).argmax(axis=1)
+    return assignment
+
+
+def pair_squared_distances(data, centroids):
+    '''
+    Squared Euclidean Distances
+        Row i of data to row i of centroids, bit for bit the values
+        squared_distances gives for the same pairs
+
+    :param data: (m, d) array of samples
+    :param centroids: (m, d) array of centroids
+    :returns: (m,) array of squared distances
+    '''
+    diff = data - centroids
+    return np.einsum('id,id->i', diff, diff)
+
+
+def elkan_assign(data, centroids, assignment, upper, lower, rng=None):
+    '''
+    Assigns every sample to its closest centroid - Elkan
+        Keeps an upper bound on every sample's distance to its own centroid
+        and a lower bound to every other centroid. By the triangle
+        inequality, a centroid j can only be closer than the own centroid a
+        if upper > lower[j] and upper > d(c_a, c_j) / 2, and a sample can only
+        move at all if upper > min_j d(c_a, c_j) / 2. Only the distances that
+        pass these tests are computed. The assignment is the one assign gives
+        with the same rng.
+
+    :param data: (n, d) array of samples
+    :param centroids: (k, d) array of centroids
+    :param assignment: (n,) current cluster indices, updated in place
+    :param upper: (n,) upper bounds, updated in place
+    :param lower: (n, k) lower bounds, updated in place
+    :param rng: numpy Generator to randomize ties, see assign
+    :returns: number of distances computed, the k (k - 1) / 2 between
+              centroids included
+    '''
+    k = len(centroids)
+    half = 0.5 * np.sqrt(squared_distances(centroids, centroids))
+    np.fill_diagonal(half, np.inf)
+    closest_half = half.min(axis=1)
+    np.fill_diagonal(half, 0)
+
+    active = np.flatnonzero(upper * BOUND_SLACK >= closest_half[assignment])
+    if len(active) == 0:
+        return k * (k - 1) // 2
+    own = assignment[active]
+    own_d2 = pair_squared_distances(data[active], centroids[own])
+    bound = np.sqrt(own_d2) * BOUND_SLACK
+    lower[active, own] = np.sqrt(own_d2)
+
+    # Centroids the bounds cannot rule out
+    candidates = (lower[active] <= bound[:, None]) & (half[own] <= bound[:, None])
+    candidates[np.arange(len(active)), own] = False
+    rows, cols = np.nonzero(candidates)
+    d2 = pair_squared_distances(data[active[rows]], centroids[cols])
+    lower[active[rows], cols] = np.sqrt(d2)
+
+    # Closest centroid among the computed ones, ties as in assign
+    known = np.full((len(active), k), np.inf)
+    known[np.arange(len(active)), own] = own_d2
+    known[rows, cols] = d2
+    closest = assign_distances(known, rng)
+
+    assignment[active] = closest
+    upper[active] = np.sqrt(known[np.arange(len(active)), closest])
+    return len(active) + len(rows) + k * (k - 1) // 2
+
+
+def update_centroids(data, assignment, k):
+    '''
+    Updates Centroids
+        Mean of the samples of every cluster, grouped with np.add.at
+
+    :param data: (n, d) array of samples
+    :param assignment: (n,) int array of cluster indices
+    :param k: number of clusters
+    :returns: (k, d) array of centroids and (k,) array of cluster sizes,
+              centroids of empty clusters are nan
+    '''
+    counts = np.bincount(assignment, minlength=k)
+    sums = np.zeros((k, data.shape[1]))
+    np.add.at(sums, assignment, data)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts[:, None], counts
+
+
+def remove_empty(centroids, assignment, counts):
+    '''
+    Vanishing Clusters
+        Drops clusters without samples and renumbers the assignment
+
+    :returns: centroids and assignment of the remaining clusters
+    '''
+    keep = counts > 0
+    if keep.all():
+        return centroids, assignment
+    return centroids[keep], (np.cumsum(keep) - 1)[assignment]
+
+
+def get_ss_total(data, centroids, assignment):
+    '''
+    Gets SS_Total
+        SS_Total: the sum of the squared distances
+                  from each example to its cluster's centroid
+    :returns: ss_total
+    '''
+    return float(((data - centroids[assignment]) ** 2).sum())
+
+
+def random_centroids(data, k, rng):
+    '''
+    Initial Centroids
+        k distinct samples chosen uniformly at random
+
+    :returns: (k, d) array of centroids
+    '''
+    return data[rng.choice(len(data), k, replace=False)].copy()
+
+
+def plus_plus_centroids(data, k, rng, weights=None):
+    '''
+    Initial Centroids - k-means++
+        The first centroid is a random sample, every next one a sample drawn
+        with probability proportional to its squared distance to the closest
+        centroid so far. The closest distances are updated against the new
+        centroid only, one vectorized pass per centroid.
+
+    :param weights: (n,) sample weights, used by parallel_centroids
+    :returns: (k, d) array of centroids
+    '''
+    n = len(data)
+    weights = weights if weights is not None else np.ones(n)
+    chosen = [rng.choice(n, p=weights / weights.sum())]
+    closest = squared_distances(data, data[chosen[0]][None, :])[:, 0]
+    for j in range(1, k):
+        p = weights * closest
+        if p.sum() > 0:
+            i = rng.choice(n, p=p / p.sum())
+        else:
+            # Every sample sits on a centroid, fall back to an unused sample
+            i = rng.choice(np.setdiff1d(np.arange(n), chosen))
+        chosen.append(i)
+        np.minimum(closest, squared_distances(data, data[i][None, :])[:, 0], out=closest)
+
+    return data[chosen].copy()
+
+
+def parallel_centroids(data, k, rng, rounds=5, oversampling=None):
+    '''
+    Initial Centroids - k-means||
+        Starts from one random sample, then for a few rounds draws every
+        sample independently with probability oversampling * d^2 / cost,
+        so each round is a single pass over the data. The candidates, weighted
+        by the samples closest to them, are reduced to k with k-means++.
+
+    :param rounds: sampling rounds
+    :param oversampling: expected candidates per round, defaults to 2k
+    :returns: (k, d) array of centroids
+    '''
+    n = len(data)
+    oversampling = oversampling if oversampling is not None else 2 * k
+    chosen = np.zeros(n, dtype=bool)
+    chosen[rng.integers(0, n)] = True
+    closest = squared_distances(data, data[chosen])[:, 0]
+
+    for r in range(0, rounds):
+        cost = closest.sum()
+        if cost == 0:
+            break
+        drawn = ~chosen & (rng.random(n) < oversampling * closest / cost)
+        if drawn.any():
+            chosen |= drawn
+            np.minimum(closest, squared_distances(data, data[drawn]).min(axis=1), out=closest)
+
+    candidates = data[chosen]
+    if len(candidates) < k:
+        # Too few candidates, top up with random unused samples
+        extra = rng.choice(np.flatnonzero(~chosen), k - len(candidates), replace=False)
+        candidates = np.vstack([candidates, data[extra]])
+    weights = np.bincount(assign(data, candidates), minlength=len(candidates)).astype(float)
+    return plus_plus_centroids(candidates, k, rng, np.maximum(weights, 1e-12))
+
+
+INITS = {
+    'random': random_centroids,
+    'k-means++': plus_plus_centroids,
+    'k-means||': parallel_centroids,
+}
+
+
+def initial_centroids(data, k, rng, init='random'):
+    '''
+    Initial Centroids
+
+    :param init: 'random', 'k-means++' or 'k-means||'
+    :returns: (k, d) array of centroids
+    '''
+    if init not in INITS:
+        raise ValueError('init must be one of ' + ', '.join(INITS))
+    return INITS[init](data, k, rng)
+
+
+def k_means(data, k, iterations, rng=None, centroids=None, random_ties=True, tolerance=0.0,
+            init='random', accelerate=False):
+    '''
+    K-Means Algorithm
+        Lloyd iterations on an (n, d) sample array, stopping early once the
+        assignment no longer changes, since every later iteration would then
+        repeat the last one, or once no centroid moves more than tolerance
+
+    :param data: (n, d) array of samples
+    :param k: number of clusters
+    :param iterations: max iterations
+    :param rng: numpy Generator for the initial centroids and ties
+    :param centroids: (k, d) array of initial centroids, chosen by init if None
+    :param random_ties: randomize ties like the original per-sample loop,
+                        otherwise ties go to the lowest cluster index
+    :param tolerance: stop once the largest centroid shift is at most this,
+                      0.0 only stops on an unchanged assignment
+    :param init: seeding when no centroids are given, see initial_centroids
+    :param accelerate: assign with elkan_assign after the first iteration,
+                       giving the same clusters with fewer distance computations
+    :returns: Result, its centroids and assignment cover k' <= k clusters as
+              clusters that lose all samples vanish
+    '''
+    rng = rng if rng is not None else np.random.default_rng()
+    if centroids is None:
+        centroids = initial_centroids(data, k, rng, init)
+
+    assignment = None
+    upper = lower = None
+    evaluations = 0
+    stop_reason = MAX_ITERATIONS
+    i = 0
+    while i < iterations:
+        previous = assignment
+        if upper is None:
+            d2 = squared_distances(data, centroids)
+            assignment = assign_distances(d2, rng if random_ties else None)
+            evaluations += d2.size
+            if accelerate:
+                lower = np.sqrt(d2)
+                upper = lower[np.arange(len(data)), assignment]
+        else:
+            assignment = assignment.copy()
+            evaluations += elkan_assign(data, centroids, assignment, upper, lower,
+                                        rng if random_ties else None)
+        if previous is not None and np.array_equal(assignment, previous):
+            stop_reason = CONVERGED
+            break
+        i += 1
+
+        new_centroids, counts = update_centroids(data, assignment, len(centroids))
+        moved = np.sqrt(((new_centroids - centroids) ** 2).sum(axis=1))
+        shift = moved[counts > 0].max()
+        centroids, assignment = remove_empty(new_centroids, assignment, counts)
+        if upper is not None:
+            # Bounds follow their centroids, vanished clusters drop out
+            upper += moved[counts > 0][assignment]
+            lower = np.maximum(lower[:, counts > 0] - moved[counts > 0], 0)
+        if shift <= tolerance and counts.all():
+            stop_reason = TOLERANCE if shift > 0 else CONVERGED
+            break
+
+    if assignment is None:
+        assignment = np.zeros(len(data), dtype=np.int64)
+    return Result(get_ss_total(data, centroids, assignment), centroids, assignment, i, stop_reason,
+                  evaluations)
+
+
+def reservoir_sample(chunks, size, rng):
+    '''
+    Uniform Sample of a Stream
+        Reservoir sampling, keeps at most size samples in memory
+
+    :param chunks: iterable of (m, d) sample arrays
+    :returns: (min(size, n), d) array of samples
+    '''
+    reservoir = None
+    seen = 0
+    for chunk in chunks:
+        if reservoir is None:
+            reservoir = np.empty((size, chunk.shape[1]))
+        # Fill up first, then sample i replaces a random slot with probability size / (i + 1)
+        fill = min(max(size - seen, 0), len(chunk))
+        reservoir[seen:seen + fill] = chunk[:fill]
+        if fill < len(chunk):
+            slots = rng.integers(0, np.arange(seen + fill, seen + len(chunk)) + 1)
+            keep = slots < size
+            for slot, row in zip(slots[keep], chunk[fill:][keep]):
+                reservoir[slot] = row
+        seen += len(chunk)
+
+    return reservoir[:min(size, seen)]
+
+
+def mini_batch_k_means(chunks, k, rng=None, epochs=1, init='k-means++', init_size=None):
+    '''
+    Mini-Batch K-Means
+        Streams the samples chunk by chunk, every chunk is one mini-batch.
+        Each cluster keeps the number of samples it has absorbed so far and
+        moves its centroid by the running mean of them, so only the current
+        chunk, the centroids and the counts are ever in memory. The initial
+        centroids are seeded on a uniform sample of the whole stream, taken in
+        one extra pass, since files are often sorted by label.
+
+    :param chunks: function returning a fresh iterable of (m, d) sample
+                   arrays, e.g. lambda: lib.read_chunks(path), called once
+                   per pass
+    :param k: number of clusters
+    :param rng: numpy Generator for the initial centroids
+    :param epochs: passes over the stream
+    :param init: seeding on the sample, see initial_centroids
+    :param init_size: samples to seed on, defaults to max(100 k, 1000)
+    :returns: (k, d) array of centroids and (k,) samples absorbed per cluster
+    '''
+    rng = rng if rng is not None else np.random.default_rng()
+    sample = reservoir_sample(chunks(), init_size or max(100 * k, 1000), rng)
+    if len(sample) < k:
+        raise ValueError('the stream needs at least k samples')
+    centroids = initial_centroids(sample, k, rng, init)
+
+    counts = np.zeros(k)
+    for epoch in range(0, epochs):
+        for chunk in chunks():
+            assignment = assign(chunk, centroids)
+            batch_counts = np.bincount(assignment, minlength=k)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, chunk)
+
+            # Per-cluster learning rate 1 / count, the running mean update
+            moved = batch_counts > 0
+            counts += batch_counts
+            centroids[moved] += (sums[moved] - batch_counts[moved, None] * centroids[moved]) \
+                / counts[moved, None]
+
+    return centroids, counts
+
+
+def stream_assign(chunks, centroids):
+    '''
+    Assigns a stream of samples chunk by chunk
+
+    :param chunks: iterable of (m, d) sample arrays
+    :returns: generator of (m,) cluster index and (m,) squared distance to
+              that centroid per chunk
+    '''
+    for chunk in chunks:
+        d2 = squared_distances(chunk, centroids)
+        assignment = d2.argmin(axis=1)
+        yield assignment, d2[np.arange(len(chunk)), assignment]
+
+
+def stream_ss_total(chunks, centroids):
+    '''
+    Gets SS_Total of a stream of samples chunk by chunk
+
+    :param chunks: iterable of (m, d) sample arrays
+    :returns: ss_total
+    '''
+    return float(sum(d2.sum() for assignment, d2 in stream_assign(chunks, centroids)))
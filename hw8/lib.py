@@ -1,33 +1,58 @@
 # Python Lib Import
 import csv
-from random import randint
+import os
+
+import numpy as np
 
 
 class Cluster(object):
     '''
     K-Means Cluster Object
+        Thin view over the rows of the samples tied to this cluster
 
     Attributes:
-        centroid: Iris object representing the centroid of this cluster
-        samples: array of samples tied to this cluster
+        centroid: Point, or Iris, representing the centroid of this cluster
+        points: (m, d) array of the samples tied to this cluster
+        samples: views of the rows of points, of the centroid's type
     '''
 
-    def __init__(self, centroid):
+    def __init__(self, centroid, points=None):
         '''
         Constructor
 
-        :param centroid: Iris centroid of this cluster
+        :param centroid: Point or Iris centroid of this cluster
+        :param points: (m, d) array of samples, defaults to none
         '''
         self.centroid = centroid
-        self.samples = []
+        self.points = points if points is not None else np.empty((0, len(centroid.row)))
+
+    @classmethod
+    def from_assignment(cls, data, centroids, assignment, point=None):
+        '''
+        Constructor - one cluster per centroid of a K-Means run
+
+        :param data: (n, d) array of samples
+        :param centroids: (k, d) array of centroids
+        :param assignment: (n,) cluster index of every sample
+        :param point: view class of the centroids and samples, defaults to Point
+        :returns: array of clusters
+        '''
+        point = point or Point
+        return [cls(point.from_row(centroids[j]), data[assignment == j])
+                for j in range(0, len(centroids))]
+
+    @property
+    def samples(self):
+        view = type(self.centroid)
+        return [view.from_row(row) for row in self.points]
 
     def add_sample(self, sample):
         '''
         Adds new sample to this cluster
 
-        :param sample: Iris Object to add
+        :param sample: Point or Iris Object to add
         '''
-        self.samples.append(sample)
+        self.points = np.vstack([self.points, sample.row])
 
     def get_ss_total(self):
         '''
@@ -36,43 +61,107 @@ class Cluster(object):
                       from each example to its cluster's centroid
         :returns: ss_total
         '''
-        ss_total = 0.0
-        for sample in self.samples:
-            ss_total += sample.distance(self.centroid) ** 2
-
-        return ss_total
+        return float(((self.points - self.centroid.row) ** 2).sum())
 
     def update_centroid(self):
         '''
         Updates Centroid
             Mean of all samples currently in this cluster
         '''
-        attributes = ['sepal_l', 'sepal_w', 'petal_l', 'petal_w']
-        for attr in attributes:
-            new_attr = 0.0
-            for sample in self.samples:
-                new_attr += getattr(sample, attr)
-            new_attr /= len(self.samples)
-            setattr(self.centroid, attr, new_attr)
+        self.centroid.row[:] = self.points.mean(axis=0)
 
     def clear_samples(self):
         '''
         Clears Samples
         '''
-        self.samples = []
+        self.points = self.points[:0]
 
 
-class Iris(object):
+class Point(object):
     '''
     Coordinate Object
+        Thin view over a row of d floats, usually a row of a sample array
+
+    Attributes:
+        row: float64 array of the coordinates
+    '''
+
+    def __init__(self, *coordinates):
+        '''
+        Constructor
+
+        :param coordinates: initial coordinates
+        '''
+        self.row = np.array(coordinates, dtype=float)
+
+    @classmethod
+    def from_row(cls, row):
+        '''
+        Constructor - View, changes to the Point write through to row
+
+        :param row: array of coordinates
+        '''
+        point = cls.__new__(cls)
+        point.row = row
+        return point
+
+    @classmethod
+    def from_point(cls, point):
+        '''
+        Constructor - Deep-Copy
+
+        :param point: point to duplicate
+        '''
+        return cls.from_row(point.row.copy())
+
+    def distance(self, point):
+        '''
+        Distance Function
+            Euclidean Distance
+
+        :param point: Coordinate to get distance from
+        :returns: Euclidean distance
+        '''
+        return float(np.sqrt(((self.row - point.row) ** 2).sum()))
+
+    def __len__(self):
+        return len(self.row)
+
+    def __str__(self):
+        return " ".join("%f" % x for x in self.row)
+
+
+def feature(column):
+    '''
+    Property reading and writing one column of a Point row
+    '''
+    def get(self):
+        return self.row[column]
+
+    def set(self, value):
+        self.row[column] = value
+
+    return property(get, set)
+
+
+class Iris(Point):
+    '''
+    Iris Coordinate Object
+        Point of the 4 iris measurements, kept for the original API
 
     Attributes:
+        row: array of the 4 coordinates below
         sepal_l: sepal length in cm
         sepal_w: sepal width in cm
         petal_l: petal length in cm
         petal_w: petal width in cm
     '''
 
+    sepal_l = feature(0)
+    sepal_w = feature(1)
+    petal_l = feature(2)
+    petal_w = feature(3)
+
     def __init__(self, sepal_l=0.0, sepal_w=0.0, petal_l=0.0, petal_w=0.0):
         '''
         Constructor
@@ -82,10 +171,7 @@ class Iris(object):
         :param petal_l: initial petal_l coordinate, defaults to 0.0
         :param petal_w: initial petal_w coordinate, defaults to 0.0
         '''
-        self.sepal_l = sepal_l
-        self.sepal_w = sepal_w
-        self.petal_l = petal_l
-        self.petal_w = petal_w
+        Point.__init__(self, sepal_l, sepal_w, petal_l, petal_w)
 
     @classmethod
     def from_iris(cls, new_iris):
@@ -94,56 +180,163 @@ class Iris(object):
 
         :param new_iris: iris object to duplicate
         '''
-        return Iris(new_iris.sepal_l, new_iris.sepal_w, new_iris.petal_l, new_iris.petal_w)
+        return cls.from_point(new_iris)
 
-    def distance(self, new_iris):
-        '''
-        Distance Function
-            Euclidean Distance
 
-        :param new_iris: Coordinate to get distance from
-        :returns: Euclidean distance
-        '''
-        attributes = ['sepal_l', 'sepal_w', 'petal_l', 'petal_w']
-        total = 0.0
+def to_array(samples):
+    '''
+    Sample Array
+        Arrays are used as they are, Points are stacked into one
 
-        for attr in attributes:
-            total += (getattr(self, attr) - getattr(new_iris, attr)) ** 2
+    :param samples: (n, d) float array or array of Point objects
+    :returns: (n, d) float64 array, one row per sample
+    '''
+    if isinstance(samples, np.ndarray):
+        return samples
+    return np.array([sample.row for sample in samples], dtype=float)
 
-        return total ** 0.5
 
-    def __str__(self):
-        return "%f %f %f %f" % (self.sepal_l, self.sepal_w, self.petal_l, self.petal_w)
+DATA_FILE = 'data/iris.data.txt'
 
+# Parsed datasets by path: (csv mtime, options, samples, labels, label names)
+datasets = {}
 
-def import_data():
+
+def cache_file(data_file):
     '''
-    Imports Iris Data
+    :returns: path of the parsed sidecar of data_file
+    '''
+    return data_file + '.npz'
 
-    :returns: array of iris samples and array of iris labels
+
+def read_rows(data_file, label_column=-1, header=False):
     '''
-    data_file = 'data/iris.data.txt'
-    iris_samples = []
-    iris_labels = {}
+    Reads a CSV of numeric features, blank rows are skipped
 
+    :param label_column: index of the label column, negative counts from
+                         the end, None when there is none
+    :param header: skip the first row
+    :returns: generator of (feature list, label or None) per row
+    '''
     with open(data_file, 'r') as csvfile:
-        iris_reader = csv.reader(csvfile, delimiter=',')
-        for row in iris_reader:
+        reader = csv.reader(csvfile, delimiter=',')
+        if header:
+            next(reader, None)
+        for row in reader:
             if len(row) == 0:
                 continue
 
-            sample = Iris(float(row[0]), float(row[1]), float(row[2]), float(row[3]))
-            iris_samples.append(sample)
-            iris_labels[str(sample)] = row[4]
+            if label_column is None:
+                yield [float(x) for x in row], None
+            else:
+                label = row.pop(label_column)
+                yield [float(x) for x in row], label
+
+
+def parse_data(data_file, label_column=-1, header=False):
+    '''
+    Parses a CSV of d numeric features and an optional label per row
+
+    :param label_column: see read_rows
+    :param header: see read_rows
+    :returns: (n, d) float64 array, then for labelled data an (n,) int label
+              array and an array of label names in order of first appearance,
+              None for both otherwise
+    '''
+    rows = []
+    labels = []
+    names = {}
+    for features, label in read_rows(data_file, label_column, header):
+        rows.append(features)
+        if label is not None:
+            labels.append(names.setdefault(label, len(names)))
+
+    samples = np.array(rows, dtype=float)
+    if samples.ndim != 2:
+        samples = samples.reshape(len(rows), -1)
+    if label_column is None:
+        return samples, None, None
+    return samples, np.array(labels, dtype=np.int64), np.array(list(names))
+
+
+def load_dataset(data_file=DATA_FILE, label_column=-1, header=False):
+    '''
+    Loads a Dataset
+        The CSV is parsed once per process and cached next to it as a .npz
+        sidecar, which is reparsed when the CSV's mtime or the parse options
+        change. Every call returns the same in-memory arrays, so treat them
+        as read-only.
+
+    :param data_file: CSV path, defaults to the iris data
+    :param label_column: see read_rows
+    :param header: see read_rows
+    :returns: (n, d) float64 array, (n,) int label array and array of label
+              names, both None without a label column
+    '''
+    mtime = os.path.getmtime(data_file)
+    options = str((label_column, header))
+    key = os.path.abspath(data_file)
+    if key in datasets and datasets[key][0:2] == (mtime, options):
+        return datasets[key][2:]
+
+    sidecar = cache_file(data_file)
+    dataset = None
+    if os.path.exists(sidecar):
+        with np.load(sidecar) as cached:
+            if cached['mtime'] == mtime and 'options' in cached.files \
+                    and str(cached['options']) == options:
+                labelled = 'labels' in cached.files
+                dataset = (cached['samples'],
+                           cached['labels'] if labelled else None,
+                           cached['names'] if labelled else None)
+
+    if dataset is None:
+        dataset = parse_data(data_file, label_column, header)
+        arrays = {'mtime': mtime, 'options': options, 'samples': dataset[0]}
+        if dataset[1] is not None:
+            arrays.update(labels=dataset[1], names=dataset[2])
+        try:
+            with open(sidecar + '.tmp', 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(sidecar + '.tmp', sidecar)
+        except OSError:
+            # Read-only data directory, keep the in-memory copy only
+            pass
+
+    datasets[key] = (mtime, options) + dataset
+    return dataset
+
+
+def read_chunks(data_file=DATA_FILE, chunk_size=65536, label_column=-1, header=False):
+    '''
+    Streams the features of a CSV in chunks
+        Only one chunk is held at a time, labels are skipped
 
-    return iris_samples, iris_labels
+    :param chunk_size: rows per chunk, the last chunk may be shorter
+    :param label_column: see read_rows
+    :param header: see read_rows
+    :returns: generator of (m, d) float64 arrays
+    '''
+    rows = []
+    for features, label in read_rows(data_file, label_column, header):
+        rows.append(features)
+        if len(rows) == chunk_size:
+            yield np.array(rows, dtype=float)
+            rows = []
 
+    if rows:
+        yield np.array(rows, dtype=float)
 
-def randomize(max):
+
+def import_data():
     '''
-    Random Function
+    Imports Iris Data
+        Samples are Iris views of the rows of load_dataset's array
 
-    :param max: upper limit on randomization
-    :returns: random int [0, max)
+    :returns: array of iris samples and array of their label names, aligned
+              by row index
     '''
-    return randint(0, max - 1)
+    data, labels, names = load_dataset()
+    iris_samples = [Iris.from_row(row) for row in data]
+
+    return iris_samples, names[labels]
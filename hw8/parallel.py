@@ -0,0 +1,111 @@
+# Python Lib Imports
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+# Local Import
+import kmeans
+
+
+class SharedArray(object):
+    '''
+    Float Array in Shared Memory
+        Workers attach by name, so the samples are never pickled per job
+
+    Attributes:
+        array: numpy array backed by the shared block
+        name: name of the shared block
+    '''
+
+    def __init__(self, shape, name=None):
+        '''
+        Constructor
+            Creates a new block, or attaches to an existing one
+
+        :param shape: shape of the float64 array
+        :param name: name of an existing block to attach to
+        '''
+        size = max(1, int(np.prod(shape)) * np.dtype(np.float64).itemsize)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+
+    @classmethod
+    def from_array(cls, array):
+        '''
+        Constructor - copies array into a new block
+        '''
+        shared = cls(array.shape)
+        shared.array[:] = array
+        return shared
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        '''
+        Detaches from the block, call unlink() as well from the owner
+        '''
+        self.array = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def restart_worker(args):
+    '''
+    One K-Means restart on the shared samples
+
+    :param args: block name, sample shape, k, iterations, SeedSequence,
+                 tolerance and init
+    :returns: kmeans.Result
+    '''
+    name, shape, k, iterations, seed, tolerance, init = args
+    samples = SharedArray(shape, name)
+    result = kmeans.k_means(samples.array, k, iterations, np.random.default_rng(seed),
+                            tolerance=tolerance, init=init)
+    samples.close()
+    return result
+
+
+def run_restarts(data, configs, restarts=4, processes=None, seed=None, tolerance=0.0,
+                 init='random'):
+    '''
+    Parallel Restarts
+        Every (k, iterations, restart) job runs in a process pool with its own
+        seed, all of them reading the same shared sample array
+
+    :param data: (n, d) array of samples
+    :param configs: array of (k, iterations) pairs
+    :param restarts: independent runs per configuration
+    :param processes: pool size, defaults to the number of cores
+    :param seed: seed every job's SeedSequence is spawned from
+    :param tolerance: centroid shift to stop at, see kmeans.k_means
+    :param init: seeding of the initial centroids, see kmeans.initial_centroids
+    :returns: array of the restarts' kmeans.Result per configuration
+    '''
+    seeds = np.random.SeedSequence(seed).spawn(len(configs) * restarts)
+    samples = SharedArray.from_array(data)
+    try:
+        jobs = [(samples.name, data.shape, k, iterations, seeds[c * restarts + i],
+                 tolerance, init)
+                for c, (k, iterations) in enumerate(configs) for i in range(0, restarts)]
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(restart_worker, jobs)
+    finally:
+        samples.close()
+        samples.unlink()
+
+    return [results[c * restarts:(c + 1) * restarts] for c in range(0, len(configs))]
+
+
+def best_result(results):
+    '''
+    :param results: array of kmeans.Result
+    :returns: result with the lowest SS_Total, the first one on ties
+    '''
+    return min(results, key=lambda result: result.ss_total)